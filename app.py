@@ -1,147 +1,67 @@
 import streamlit as st
 import cv2
-import numpy as np
-from PIL import Image
-from modular import predict_image
+from modular import frame_probabilities, predict_frame, wait_for_warm_up, warm_up_async
+from camera_pipeline import CameraPipeline
+from video_source import SampledVideoSource, GatedPredictor
+from temporal import SmoothedPredictor
+from frame_cache import CachedPredictor
+from frame_renderer import FrameRenderer
+from rate_control import AdaptiveRate, CPU_BUDGET
+from detection_store import get_store, log_entry
+from cooldown import cooldown_key, get_cooldowns
+from species_catalog import get_catalog
+from metrics import metrics, METRICS_FILE, show_diagnostics, start_metrics_server
 import time
-import json
-import os
 from datetime import datetime, timedelta
 
-# Create logs directory if it doesn't exist
-if not os.path.exists("logs"):
-    os.makedirs("logs")
-
-# Log file path
-LOG_FILE = "logs/detection_logs.json"
-
-# Species info file path (make sure this points to the correct location)
-SPECIES_INFO_FILE = "database/endangered.json"
-
-
-# Load species information
-def load_species_info():
-    try:
-        if os.path.exists(SPECIES_INFO_FILE):
-            with open(SPECIES_INFO_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        else:
-            st.warning(f"Species info file not found: {SPECIES_INFO_FILE}")
-            return {}
-    except Exception as e:
-        st.error(f"Error loading species info: {e}")
-        return {}
+# Species information, loaded once per process and reloaded when the file changes
+species_catalog = get_catalog()
 
 
 # Get species details
 def get_species_details(class_name):
-    species_info = load_species_info()
-
-    # Try direct match first
-    if class_name in species_info:
-        return species_info[class_name]
-
-    # If no direct match, try case-insensitive match or partial match
-    for species, info in species_info.items():
-        if class_name.lower() in species.lower() or species.lower() in class_name.lower():
-            return info
-
-    # If no match found, return default values
-    return {
-        "scientific_name": "Not available",
-        "status": "Unknown"
-    }
-
-
-# Initialize log file if it doesn't exist or is invalid
-def initialize_log_file():
-    try:
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, "r") as f:
-                file_content = f.read().strip()
-                if not file_content:
-                    # File exists but is empty
-                    with open(LOG_FILE, "w") as f:
-                        json.dump([], f)
-                else:
-                    # Check if content is valid JSON
-                    try:
-                        json.loads(file_content)
-                    except json.JSONDecodeError:
-                        # Invalid JSON, reset file
-                        with open(LOG_FILE, "w") as f:
-                            json.dump([], f)
-        else:
-            # File doesn't exist, create it
-            with open(LOG_FILE, "w") as f:
-                json.dump([], f)
-    except Exception as e:
-        st.error(f"Error initializing log file: {e}")
-        # Try again with error handling
-        try:
-            with open(LOG_FILE, "w") as f:
-                json.dump([], f)
-        except Exception as e:
-            st.error(f"Failed to create log file: {e}")
+    species_details = species_catalog.lookup(class_name)
+    if species_catalog.error:
+        st.warning(species_catalog.error)
+    return species_details
 
 
-# Call the initialization function
-initialize_log_file()
+# Append-only detection store (migrates the old JSON array log on first use)
+detection_store = get_store()
 
+# Cooldowns shared by every session, per source and species
+cooldowns = get_cooldowns()
 
-# Function to save detection to log file with cooldown check
-def log_detection(class_name, category, confidence_score):
-    # Check if we're in cooldown period for this species
-    current_time = datetime.now()
+# Serve /metrics once per process when DETECTION_METRICS_PORT is set
+start_metrics_server()
 
-    # Get the last detection time for this species from session state
-    last_detection_key = f"last_detection_{class_name}"
-    last_detection_time = st.session_state.get(last_detection_key)
+# Load and warm up the shared model in the background (once per process),
+# so it is usually ready by the time the camera is started
+warm_up_async()
 
-    # Define cooldown period (in seconds)
-    cooldown_period = 30  # 30 seconds cooldown
 
-    # If we have a previous detection time and we're still in cooldown period, skip logging
-    if last_detection_time and (current_time - last_detection_time).total_seconds() < cooldown_period:
+# Function to save detection to log file with cooldown check.
+# Returns (timestamp, remaining cooldown seconds); timestamp is None when nothing was logged.
+def log_detection(source, class_name, category, confidence_score):
+    # Claim the log slot in the shared cooldown tracker (same for every tab and across restarts)
+    logged, remaining = cooldowns.check_and_set(source, class_name, category)
+    if not logged:
         # We're in cooldown, don't log
-        return None
+        return None, remaining
 
-    # Not in cooldown, proceed with logging
-    timestamp = current_time.strftime("%Y-%m-%d %H:%M:%S")
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     try:
-        # Read existing logs with error handling
-        try:
-            with open(LOG_FILE, "r") as f:
-                file_content = f.read().strip()
-                if not file_content:
-                    logs = []
-                else:
-                    logs = json.loads(file_content)
-        except json.JSONDecodeError:
-            logs = []
-
-        # Add new log
-        log_entry = {
-            "timestamp": timestamp,
-            "class_name": class_name,
-            "category": category,
-            "confidence_score": float(confidence_score)
-        }
-
-        logs.append(log_entry)
-
-        # Save updated logs
-        with open(LOG_FILE, "w") as f:
-            json.dump(logs, f, indent=4)
-
-        # Update session state with current time for this species
-        st.session_state[last_detection_key] = current_time
-
+        # Append the new log entry; no need to read the existing history
+        with metrics.stage("log_write"):
+            log_entry(class_name, category, confidence_score, timestamp, store=detection_store)
+        metrics.increment("detections_logged")
     except Exception as e:
+        cooldowns.release(source, class_name)
         st.error(f"Error logging detection: {e}")
+        return None, 0
 
-    return timestamp
+    return timestamp, 0
 
 
 # Initialize session state for tracking last detections if it doesn't exist
@@ -199,134 +119,239 @@ with col2:
     # This is where your camera feed will go
     camera_placeholder = st.empty()
 
+    # Capture / inference rates of the camera pipeline
+    stats_placeholder = st.empty()
+
+    # Per-stage timings, only when DETECTION_METRICS=1
+    if metrics.enabled:
+        with st.expander("Diagnostics"):
+            diagnostics_placeholder = st.empty()
+
+    # Video source: the local camera, or a video file / stream URL
+    source_type = st.radio("Source", ["Camera", "Video file or stream"], horizontal=True)
+    if source_type == "Video file or stream":
+        video_source = st.text_input("Video file path or stream URL (e.g. rtsp://...)")
+        sample_fps = st.number_input("Frames sampled per second", min_value=0.1, max_value=30.0, value=2.0)
+    motion_gating = st.checkbox("Skip inference on static scenes (motion gating)", value=source_type != "Camera")
+    smoothing = st.checkbox("Smooth predictions across frames", value=True,
+                            help="Only report a species once it is stable over several frames, and skip the model while a confident detection persists")
+    caching = st.checkbox("Reuse predictions for near-identical frames", value=True,
+                          help="Frames whose perceptual hash is within a few bits of a recent frame reuse its prediction")
+    adaptive_rate = st.checkbox("Adapt the inference rate to load and activity", value=True,
+                                help="Runs the model less often on idle scenes and busy hosts, and at full rate on motion or a possible detection")
+
+    # How much the detector may cost; lower values save power on battery or solar hosts
+    if adaptive_rate:
+        with st.expander("Power settings"):
+            cpu_budget = st.slider("CPU budget (% of all cores)", min_value=10, max_value=100,
+                                   value=int(CPU_BUDGET * 100), step=5) / 100
+            max_interval = st.slider("Longest interval on idle scenes (s)", min_value=0.5, max_value=10.0,
+                                     value=2.0, step=0.5)
+
+    # How the feed is sent to the browser; smaller and slower suits thin links
+    with st.expander("Display settings"):
+        display_width = st.select_slider("Display width (px)", options=[320, 480, 640], value=480)
+        display_quality = st.slider("JPEG quality", min_value=30, max_value=95, value=70)
+        display_fps = st.slider("Max display FPS", min_value=1, max_value=30, value=10)
+
     # Camera start button
     run_camera = st.checkbox("Start Camera")
 
 
     if run_camera:
-        cap = cv2.VideoCapture(0)  # Start the camera
+        if source_type == "Camera":
+            cap = cv2.VideoCapture(0)  # Start the camera
+
+            # Optimize camera settings to reduce delay
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)  # Lower resolution
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            cap.set(cv2.CAP_PROP_FPS, 30)  # Increase FPS
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer size
+        else:
+            cap = SampledVideoSource(video_source, sample_fps=sample_fps)
 
-        # Optimize camera settings to reduce delay
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)  # Lower resolution
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        cap.set(cv2.CAP_PROP_FPS, 30)  # Increase FPS
-        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Reduce buffer size
+        # Cooldowns are kept per source (the same keys as the Cameras page), so two cameras can log the same species
+        source_key = cooldown_key(0 if source_type == "Camera" else video_source)
 
         if not cap.isOpened():  # Show error if camera couldn't be opened
             st.error("Camera couldn't be opened! Another program might be using it.")
             run_camera = False  # End the loop
 
-        last_process_time = time.time()
-        display_frame = None
-
-        while run_camera:
-            ret, frame = cap.read()
-
-            # If image can't be captured from camera, wait for a while and try again
-            if not ret:
-                st.warning("Can't get image from camera! Check the connection.")
-                time.sleep(0.1)  # Reduced wait time
-                continue  # Continue the loop
-
-            # Process frames at a lower rate to reduce CPU load (every 200ms)
-            current_time = time.time()
-            if current_time - last_process_time > 0.1:
-                # Convert image to color format
-                image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img_pil = Image.fromarray(image)
+        # Wait for the shared model's warm-up pass so the first frame isn't slow
+        if run_camera:
+            try:
+                with st.spinner("Loading model..."):
+                    wait_for_warm_up()
+            except Exception as e:
+                # A missing model file or backend shows up here instead of on every frame
+                st.error(f"Model couldn't be loaded: {e}")
+                run_camera = False
+
+        # predict_frame classifies the raw BGR frame on the pipeline's inference thread.
+        # Optionally reuse results for near-identical frames, smooth them over time,
+        # and skip the model while the scene is static.
+        base_predictor = frame_probabilities if smoothing else predict_frame
+        cached_predictor = CachedPredictor(base_predictor) if caching else None
+        smoothed_predictor = SmoothedPredictor(probabilities=cached_predictor or base_predictor) if smoothing else None
+        predictor = smoothed_predictor or cached_predictor or predict_frame
+        gated_predictor = GatedPredictor(predictor) if motion_gating else None
+
+        # Without the adaptive rate, the model runs at most every 0.1s
+        rate = AdaptiveRate(cpu_budget=cpu_budget, max_interval=max_interval, metrics=metrics) if adaptive_rate else None
+        pipeline = CameraPipeline(cap, gated_predictor or predictor, min_interval=0.1, metrics=metrics,
+                                  rate=rate).start() if run_camera else None
+        last_result_id = 0
+        renderer = FrameRenderer(camera_placeholder, width=display_width, quality=display_quality,
+                                 max_fps=display_fps, metrics=metrics)
+        warned_read_failure = False
+        last_diagnostics = last_export = 0.0
+
+        # Streamlit stops the script by raising, so make sure the threads and camera are released
+        try:
+            while run_camera:
+                stats = pipeline.stats()
 
-                class_name, category, confidence_score = predict_image(img_pil)
+                # Stop at the end of a video file
+                if getattr(cap, "finished", False):
+                    st.info("End of video reached.")
+                    break
 
-                # Only process and display if not Environment/Human and confidence > 90%
-                if class_name and not (class_name.endswith("Human") or class_name.endswith("Environment")) and confidence_score >= 0.95:
+                # If image can't be captured from camera, warn the user once
+                if stats["read_failures"] and not warned_read_failure:
+                    st.warning("Can't get image from camera! Check the connection.")
+                    warned_read_failure = True
 
+                # A model that keeps failing (missing file, backend import error, ...) stops the camera;
+                # a single bad frame doesn't
+                if pipeline.consecutive_errors >= 5:
+                    st.error(f"Prediction failed: {pipeline.error}")
+                    break
 
-                    # Get species details
-                    species_details = get_species_details(class_name)
-                    scientific_name = species_details.get("scientific_name", "Not available")
-                    status = species_details.get("status", "Unknown")
+                # Handle the newest inference result only once
+                latest = pipeline.latest_result()
+                if latest is not None and latest["frame_id"] != last_result_id:
+                    last_result_id = latest["frame_id"]
+                    class_name, category, confidence_score = latest["result"]
 
-                    # Get status icon and color
-                    status_icon, status_color = get_status_display(status)
+                    # Only process and display if not Environment/Human and confidence > 90%
+                    if class_name and not (class_name.endswith("Human") or class_name.endswith("Environment")) and confidence_score >= 0.95:
 
-                    # Check if animal is in cooldown period
-                    last_detection_key = f"last_detection_{class_name}"
-                    last_detection_time = st.session_state.get(last_detection_key)
-                    current_datetime = datetime.now()
 
-                    # Define cooldown period (in seconds)
-                    cooldown_period = 30  # 30 seconds cooldown
+                        metrics.increment("detections")
 
-                    # If we have a previous detection and we're still in cooldown, display cooldown message
-                    if last_detection_time and (
-                            current_datetime - last_detection_time).total_seconds() < cooldown_period:
-                        # Calculate remaining cooldown time
-                        remaining = cooldown_period - int((current_datetime - last_detection_time).total_seconds())
-                        cooldown_placeholder.info(f"⏳ Cooldown: {class_name} recently logged. New log in {remaining}s")
+                        # Get species details
+                        with metrics.stage("species_lookup"):
+                            species_details = get_species_details(class_name)
+                        scientific_name = species_details.get("scientific_name", "Not available")
+                        status = species_details.get("status", "Unknown")
 
-                        # Still display the animal but don't log it
-                        label_text = f"**{class_name}**\n🟢 **Sınıfı:** {category}\n📊 **Güven Skoru:** {confidence_score * 100:.2f}%\n⚠️ **Not logged - in cooldown period**"
-                        log_status = "⚠️ Not logged - in cooldown period"
+                        # Get status icon and color
+                        status_icon, status_color = get_status_display(status)
 
-                    else:
-                        # Log the detection and get timestamp
-                        timestamp = log_detection(class_name, category, confidence_score)
+                        # Log the detection unless this species was logged from this source recently
+                        timestamp, remaining = log_detection(source_key, class_name, category, confidence_score)
 
                         if timestamp:  # If logging was successful (not in cooldown)
                             label_text = f"**{class_name}**\n🟢 **Sınıfı:** {category}\n📊 **Güven Skoru:** {confidence_score * 100:.2f}%\n⏱️ **Zaman:** {timestamp}"
                             cooldown_placeholder.success("✅ New detection logged!")
                             log_status = f"✅ Logged at {timestamp}"
-
-
-                    # Display the detection result
-                    results_placeholder.markdown(label_text)
-
-                    # Create species details content
-                    species_details_html = f"""
-                    <div style="padding-top: 10px; padding-bottom: 10px;">
-                        <hr>
-                        <h3>🔍 Species Details</h3>
-                        <table style="width: 100%;">
-                            <tr>
-                                <td style="width: 40%;"><strong>Common Name:</strong></td>
-                                <td><strong>{class_name}</strong></td>
-                            </tr>
-                            <tr>
-                                <td><strong>Scientific Name:</strong></td>
-                                <td><em>{scientific_name}</em></td>
-                            </tr>
-                            <tr>
-                                <td><strong>Conservation Status:</strong></td>
-                                <td>{status_icon} <span style='color:{status_color}'>{status}</span></td>
-                            </tr>
-                            <tr>
-                                <td><strong>Log Status:</strong></td>
-                                <td>{log_status}</td>
-                            </tr>
-                            <tr>
-                                <td><strong>Confidence Score:</strong></td>
-                                <td><span style='color:{status_color}'>{confidence_score * 100:.2f}%</span></td>
-                            </tr>
-                        </table>
-                    </div>
-                    """
-
-                    # Update the species details placeholder
-                    species_details_placeholder.markdown(species_details_html, unsafe_allow_html=True)
-
-                    # # Add label to the frame (simplified for display)
-                    # cv2.putText(frame, f"{class_name} - {confidence_score * 100:.2f}%",
-                    #             (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-                display_frame = frame
-                last_process_time = current_time
-
-            # Always display the most recent processed frame
-            if display_frame is not None:
-                camera_placeholder.image(display_frame, channels="BGR")
-
-            # Add a small sleep to prevent hogging the CPU
-            time.sleep(0.01)
-
-        cap.release()  # Release the camera
-        cv2.destroyAllWindows()
\ No newline at end of file
+                        else:
+                            if remaining:
+                                cooldown_placeholder.info(f"⏳ Cooldown: {class_name} recently logged. New log in {remaining:.0f}s")
+                                metrics.increment("cooldown_suppressions")
+
+                            # Still display the animal but don't log it
+                            label_text = f"**{class_name}**\n🟢 **Sınıfı:** {category}\n📊 **Güven Skoru:** {confidence_score * 100:.2f}%\n⚠️ **Not logged - in cooldown period**"
+                            log_status = "⚠️ Not logged - in cooldown period"
+
+
+                        # Display the detection result
+                        results_placeholder.markdown(label_text)
+
+                        # Create species details content
+                        species_details_html = f"""
+                        <div style="padding-top: 10px; padding-bottom: 10px;">
+                            <hr>
+                            <h3>🔍 Species Details</h3>
+                            <table style="width: 100%;">
+                                <tr>
+                                    <td style="width: 40%;"><strong>Common Name:</strong></td>
+                                    <td><strong>{class_name}</strong></td>
+                                </tr>
+                                <tr>
+                                    <td><strong>Scientific Name:</strong></td>
+                                    <td><em>{scientific_name}</em></td>
+                                </tr>
+                                <tr>
+                                    <td><strong>Conservation Status:</strong></td>
+                                    <td>{status_icon} <span style='color:{status_color}'>{status}</span></td>
+                                </tr>
+                                <tr>
+                                    <td><strong>Log Status:</strong></td>
+                                    <td>{log_status}</td>
+                                </tr>
+                                <tr>
+                                    <td><strong>Confidence Score:</strong></td>
+                                    <td><span style='color:{status_color}'>{confidence_score * 100:.2f}%</span></td>
+                                </tr>
+                            </table>
+                        </div>
+                        """
+
+                        # Update the species details placeholder
+                        species_details_placeholder.markdown(species_details_html, unsafe_allow_html=True)
+
+                        # # Add label to the frame (simplified for display)
+                        # cv2.putText(frame, f"{class_name} - {confidence_score * 100:.2f}%",
+                        #             (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+                # Display the most recent captured frame without waiting on the model;
+                # the renderer only sends new, changed frames, downscaled and at most display_fps a second
+                renderer.render(*pipeline.latest_frame())
+
+                stats_text = (
+                    f"Capture: {stats['capture_fps']:.1f} FPS · Inference: {stats['inference_fps']:.1f} FPS · "
+                    f"Dropped: {stats['dropped_frames']} · "
+                    f"Latency: {stats['latency_ms'] or 0:.0f} ms"
+                )
+                if gated_predictor is not None:
+                    gate_stats = gated_predictor.stats()
+                    stats_text += (
+                        f" · Static frames skipped: {gate_stats['frames_skipped']} "
+                        f"({gate_stats['budget_saved'] * 100:.0f}% inference saved)"
+                    )
+                render_stats = renderer.stats()
+                stats_text += f" · Display: {render_stats['frames_sent']} frames sent ({render_stats['mean_kb']:.0f} KB avg)"
+                if rate is not None:
+                    rate_stats = rate.stats()
+                    stats_text += f" · Interval: {rate_stats['interval']:.2f}s" + (" (idle)" if rate_stats["idle"] else "")
+                    if rate_stats["cpu"] is not None:
+                        stats_text += f" · CPU: {rate_stats['cpu'] * 100:.0f}%"
+                if cached_predictor is not None:
+                    cache_stats = cached_predictor.stats()
+                    stats_text += f" · Cache hit rate: {cache_stats['hit_rate'] * 100:.0f}%"
+                if smoothed_predictor is not None:
+                    smoothing_stats = smoothed_predictor.stats()
+                    stats_text += f" · Skipped while tracking: {smoothing_stats['frames_skipped']}"
+                    if smoothing_stats["track"]:
+                        track = smoothing_stats["track"]
+                        stats_text += f" · Tracking {track['class_name']} for {time.time() - track['started']:.0f}s"
+                stats_placeholder.caption(stats_text)
+
+                # Refresh the diagnostics panel every second and the metrics file every 5 seconds
+                if metrics.enabled:
+                    now = time.time()
+                    if now - last_diagnostics >= 1.0:
+                        show_diagnostics(diagnostics_placeholder)
+                        last_diagnostics = now
+                    if now - last_export >= 5.0:
+                        metrics.export(METRICS_FILE)
+                        last_export = now
+
+                # Sleep until the next result arrives or the next display frame is due
+                pipeline.wait_for_result(last_result_id, 1.0 / display_fps)
+        finally:
+            if pipeline is not None:
+                pipeline.stop()
+            cap.release()  # Release the camera
+            cv2.destroyAllWindows()
\ No newline at end of file
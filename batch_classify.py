@@ -0,0 +1,269 @@
+"""Classify folders of camera-trap images offline.
+
+Images are decoded and resized in a process pool and classified in batches
+with `modular.predict_records`, which keeps the top-k classes and timings of
+each image. Near-duplicates can reuse a cached result. Results are written to
+a CSV/JSONL file or the detection store, and optionally kept as prediction
+records. Finished files are recorded in a checkpoint so an interrupted run can
+be resumed by running the same command again.
+
+    python batch_classify.py path/to/images --output results.csv
+    python batch_classify.py path/to/images --store
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from frame_cache import PredictionCache, dhash
+from prediction_store import RECORDS_DIR, PredictionRecordStore
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+# Same size the model expects (kept here so worker processes never import modular)
+INPUT_SIZE = (224, 224)
+
+# Detections are only logged to the store above this score, like the camera page
+STORE_CONFIDENCE = 0.95
+
+# EXIF tags for when the photo was taken
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+OUTPUT_FIELDS = ["path", "timestamp", "class_name", "category", "confidence_score", "error"]
+
+
+def find_images(inputs):
+    """Return the sorted image files under the given files and directories."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.extend(
+                    os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_EXTENSIONS)
+                )
+        elif os.path.isfile(item):
+            paths.append(item)
+    return sorted(paths)
+
+
+def _taken_at(image, path):
+    """Capture time from EXIF, falling back to the file's modification time."""
+    try:
+        exif = image.getexif()
+        value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        if value:
+            return datetime.strptime(value.strip(), "%Y:%m:%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    except (ValueError, AttributeError):
+        pass
+    return datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _decode(path):
+    """Worker: load, center-crop and resize one image to the model's input size, and hash it."""
+    try:
+        with Image.open(path) as image:
+            taken_at = _taken_at(image, path)
+            image = ImageOps.fit(image.convert("RGB"), INPUT_SIZE, Image.Resampling.LANCZOS)
+            array = np.asarray(image)
+            return path, array, taken_at, dhash(array), None
+    except Exception as e:
+        return path, None, None, None, str(e)
+
+
+def _row(path, taken_at, record):
+    class_name, category, confidence = record.result
+    return {
+        "path": path,
+        "timestamp": taken_at,
+        "class_name": class_name,
+        "category": category,
+        "confidence_score": float(confidence) if confidence is not None else None,
+        "error": None,
+        # Full modular.PredictionRecord (top-k, probabilities, timings); not written to CSV/JSONL
+        "record": record.replace(source=path, timestamp=datetime.strptime(taken_at, "%Y-%m-%d %H:%M:%S").timestamp()),
+    }
+
+
+def classify_files(paths, batch_size=64, workers=None, cache=None):
+    """Yield one result dict per path, decoding in a process pool and predicting in batches.
+
+    With a `frame_cache.PredictionCache`, images whose perceptual hash is
+    close to an already classified one (e.g. burst shots) reuse its result.
+    """
+    from modular import predict_records
+
+    def flush(batch):
+        records = predict_records([array for _, array, _, _ in batch], batch_size=len(batch))
+        for (path, _, taken_at, key), record in zip(batch, records):
+            if cache is not None:
+                cache.put(key, record)
+            yield _row(path, taken_at, record)
+
+    with Pool(workers) as pool:
+        batch = []
+        for path, array, taken_at, key, error in pool.imap(_decode, paths, chunksize=16):
+            if error is not None:
+                yield dict.fromkeys(OUTPUT_FIELDS) | {"path": path, "error": error, "record": None}
+                continue
+            if cache is not None:
+                record = cache.get(key)
+                if record is not None:
+                    yield _row(path, taken_at, record)
+                    continue
+            batch.append((path, array, taken_at, key))
+            if len(batch) == batch_size:
+                yield from flush(batch)
+                batch = []
+        if batch:
+            yield from flush(batch)
+
+
+class _CsvOutput:
+    def __init__(self, path):
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, "a", newline="", encoding="utf-8")
+        self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+        if is_new:
+            self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonlOutput:
+    def __init__(self, path):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, rows):
+        self.file.writelines(json.dumps({key: row[key] for key in OUTPUT_FIELDS}) + "\n" for row in rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class _StoreOutput:
+    """Appends confident detections to the detection store used by the app."""
+
+    def __init__(self):
+        from detection_store import get_store
+
+        self.store = get_store()
+
+    def write(self, rows):
+        self.store.append_many([
+            {key: row[key] for key in ("timestamp", "class_name", "category", "confidence_score")}
+            for row in rows
+            if row["class_name"] and row["confidence_score"] >= STORE_CONFIDENCE
+        ])
+
+    def close(self):
+        pass
+
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.rstrip("\n") for line in f if line.strip()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify image folders with the endangered species model.")
+    parser.add_argument("inputs", nargs="+", help="Image files or directories (searched recursively)")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", help="Write all results to this .csv or .jsonl file")
+    output.add_argument("--store", action="store_true", help="Log confident detections to the detection store")
+    parser.add_argument("--batch-size", type=int, default=64, help="Images per model call (default: 64)")
+    parser.add_argument("--workers", type=int, default=None, help="Decoder processes (default: CPU count)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between progress lines")
+    parser.add_argument("--records", nargs="?", const=RECORDS_DIR, default=None,
+                        help="Also keep full prediction records (top-k, float16 probabilities, timings) "
+                             f"as Parquet in this directory (default: {RECORDS_DIR})")
+    parser.add_argument("--dedupe-distance", type=int, default=None,
+                        help="Reuse the result of an earlier image whose perceptual hash differs by at most "
+                             "this many bits (e.g. 4; default: classify every image)")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        checkpoint_path = args.checkpoint or args.output + ".checkpoint"
+        sink = _JsonlOutput(args.output) if args.output.endswith(".jsonl") else _CsvOutput(args.output)
+    else:
+        checkpoint_path = args.checkpoint or os.path.join("logs", "batch_classify.checkpoint")
+        sink = _StoreOutput()
+
+    done = _load_checkpoint(checkpoint_path)
+    paths = [path for path in find_images(args.inputs) if path not in done]
+    total = len(paths)
+    print(f"{total} images to classify ({len(done)} already done)", file=sys.stderr)
+
+    records = PredictionRecordStore(args.records) if args.records else None
+
+    cache = None
+    if args.dedupe_distance is not None:
+        cache = PredictionCache(max_entries=4096, ttl=None, max_distance=args.dedupe_distance)
+
+    start = last_report = time.time()
+    processed = detections = errors = 0
+    pending = []
+
+    # With records, commit a whole Parquet file's worth of rows at a time so the files stay large
+    commit_every = records.flush_every if records is not None else args.batch_size
+
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        def commit():
+            # Results and records first, then the checkpoint, so a crash never skips an image
+            sink.write(pending)
+            if records is not None:
+                records.append([row["record"] for row in pending if row["record"] is not None])
+                records.flush()
+            checkpoint.writelines(row["path"] + "\n" for row in pending)
+            checkpoint.flush()
+            pending.clear()
+
+        try:
+            for row in classify_files(paths, args.batch_size, args.workers, cache):
+                pending.append(row)
+                processed += 1
+                errors += row["error"] is not None
+                detections += row["class_name"] is not None
+                if len(pending) >= commit_every:
+                    commit()
+
+                now = time.time()
+                if now - last_report >= args.progress_every:
+                    rate = processed / (now - start)
+                    eta = (total - processed) / rate if rate else 0
+                    print(f"{processed}/{total} images, {rate:.1f} img/s, "
+                          f"{detections} detections, {errors} errors, ETA {eta / 60:.1f} min", file=sys.stderr)
+                    last_report = now
+        finally:
+            commit()
+            sink.close()
+            if records is not None:
+                records.close()
+
+    elapsed = time.time() - start
+    print(f"Done: {processed} images in {elapsed:.1f}s ({processed / elapsed if elapsed else 0:.1f} img/s), "
+          f"{detections} detections, {errors} errors", file=sys.stderr)
+    if cache is not None:
+        print(f"Reused {cache.hits} results for near-identical images "
+              f"({cache.stats()['hit_rate'] * 100:.1f}% of lookups)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Offline benchmarks for the inference and logging hot paths.
+
+Everything runs on synthetic frames and synthetic detection logs, so no
+camera or real history is needed:
+
+    python benchmark.py --log-sizes 1000 100000 --output results.json
+    python benchmark.py --log-sizes 1000 100000 --compare results.json
+
+Each benchmark reports latency percentiles (ms) and throughput (ops/s).
+`--output` writes the results as JSON, and `--compare` prints the ratio
+against an earlier results file.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+CATEGORIES = ["EN(G1)", "EN(G2)", "VU(G3)", "NT(G4)", "LC(G5)"]
+SPECIES = ["Lion", "Jaguar", "Vaquita", "Red Panda", "Arctic Fox", "Dugong", "Beaver", "Whale Shark"]
+
+
+def measure(name, func, repeat, items_per_call=1, warmup=1):
+    """Time `func` `repeat` times; returns latency percentiles and throughput."""
+    for _ in range(warmup):
+        func()
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings[i] = time.perf_counter() - start
+    total = timings.sum()
+    result = {
+        "name": name,
+        "calls": repeat,
+        "items_per_call": items_per_call,
+        "p50_ms": float(np.percentile(timings, 50) * 1000),
+        "p95_ms": float(np.percentile(timings, 95) * 1000),
+        "p99_ms": float(np.percentile(timings, 99) * 1000),
+        "mean_ms": float(timings.mean() * 1000),
+        "throughput_per_s": float(repeat * items_per_call / total) if total else None,
+    }
+    print(f"{name:<55} p50 {result['p50_ms']:9.3f} ms  p95 {result['p95_ms']:9.3f} ms  "
+          f"p99 {result['p99_ms']:9.3f} ms  {result['throughput_per_s'] or 0:12.1f} /s", file=sys.stderr)
+    return result
+
+
+def synthetic_frames(count, height=480, width=640, seed=0):
+    """Smooth random BGR frames, closer to camera images than pure noise."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    return [
+        cv2.resize(rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8), (width, height))
+        for _ in range(count)
+    ]
+
+
+def synthetic_entries(count, seed=0, days=365):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    step = timedelta(days=days) / max(count, 1)
+    for i in range(count):
+        species = rng.choice(SPECIES)
+        yield {
+            "timestamp": (start + step * i).strftime("%Y-%m-%d %H:%M:%S"),
+            "class_name": species,
+            "category": CATEGORIES[SPECIES.index(species) % len(CATEGORIES)],
+            "confidence_score": rng.uniform(0.9, 1.0),
+        }
+
+
+def bench_inference(args):
+    import cv2
+    from PIL import Image
+    import modular
+
+    frames = synthetic_frames(max(args.batch_size, 8))
+    pil_images = [Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames]
+    buffer = np.empty((modular.INPUT_SIZE[1], modular.INPUT_SIZE[0], 3), dtype=np.float32)
+    frame_iter = iter(range(10 ** 9))
+
+    def pick():
+        return next(frame_iter) % len(frames)
+
+    results = [
+        measure("preprocess: PIL (predict_image path)",
+                lambda: modular._preprocess_into(pil_images[pick()], buffer), args.repeat * 5),
+        measure("preprocess: cv2 BGR frame (predict_frame path)",
+                lambda: modular.preprocess_frame(frames[pick()], out=buffer), args.repeat * 5),
+    ]
+    if not args.skip_model:
+        results += [
+            measure("inference: predict_image (single)", lambda: modular.predict_image(pil_images[pick()]),
+                    args.repeat),
+            measure("inference: predict_frame (single)", lambda: modular.predict_frame(frames[pick()]),
+                    args.repeat),
+            measure(f"inference: predict_images (batch {args.batch_size})",
+                    lambda: modular.predict_images(pil_images[:args.batch_size], batch_size=args.batch_size),
+                    max(args.repeat // 5, 3), items_per_call=args.batch_size),
+        ]
+    return results
+
+
+def _filled_store(kind, directory, size):
+    from detection_store import JsonlDetectionStore, SqliteDetectionStore
+
+    if kind == "jsonl":
+        store = JsonlDetectionStore(os.path.join(directory, f"bench_{size}.jsonl"))
+    else:
+        store = SqliteDetectionStore(os.path.join(directory, f"bench_{size}.sqlite"))
+    entries = synthetic_entries(size)
+    while True:
+        chunk = [entry for _, entry in zip(range(50000), entries)]
+        if not chunk:
+            return store
+        store.append_many(chunk)
+
+
+def bench_logging(args):
+    from detection_index import DetectionIndex
+    from detection_store import log_entry
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.log_sizes:
+            for kind in args.stores:
+                print(f"Generating {size} synthetic detections ({kind})...", file=sys.stderr)
+                store = _filled_store(kind, directory, size)
+                label = f"{kind}, {size} entries"
+
+                results.append(measure(
+                    f"log append ({label})",
+                    lambda: log_entry("Lion", "VU(G3)", 0.97, "2026-01-01 00:00:00", store=store),
+                    args.repeat * 5
+                ))
+
+                if kind == "jsonl":
+                    results.append(measure(f"log startup check ({label})", store.validate_tail, args.repeat))
+
+                loads = max(min(args.repeat, 10_000_000 // max(size, 1)), 3)
+                results.append(measure(f"log load, full ({label})", store.read_all, loads, items_per_call=size))
+
+                offset = [store.read_since(0)[1]]
+
+                def load_incremental():
+                    log_entry("Lion", "VU(G3)", 0.97, "2026-01-01 00:00:00", store=store)
+                    offset[0] = store.read_since(offset[0])[1]
+
+                results.append(measure(f"log load, incremental 1 new ({label})", load_incremental, args.repeat))
+
+                index = DetectionIndex(store)
+                start = time.perf_counter()
+                index.refresh()
+                print(f"Indexed {size} entries ({kind}) in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+                start_date = index.date_bounds()[0] + timedelta(days=30)
+                end_date = start_date + timedelta(days=90)
+                filters = dict(start_date=start_date, end_date=end_date, category="VU(G3)", min_confidence=95)
+                results.append(measure(
+                    f"index refresh, 1 new ({label})",
+                    lambda: (log_entry("Lion", "VU(G3)", 0.97, "2026-01-01 00:00:00", store=store), index.refresh()),
+                    args.repeat
+                ))
+                results.append(measure(
+                    f"index aggregation ({label})",
+                    lambda: (index.summary(**filters), index.counts("day", **filters), index.counts("category", **filters)),
+                    args.repeat
+                ))
+                results.append(measure(
+                    f"index table page, 100 rows ({label})",
+                    lambda: index.rows(limit=100, offset=1000, **filters),
+                    args.repeat
+                ))
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = {r["name"]: r for r in json.load(f)["results"]}
+    print(f"\n{'benchmark':<55} {'p50 ratio':>10} {'throughput ratio':>17}")
+    for result in results:
+        old = baseline.get(result["name"])
+        if not old:
+            continue
+        p50 = result["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("nan")
+        throughput = (result["throughput_per_s"] or 0) / old["throughput_per_s"] if old["throughput_per_s"] else float("nan")
+        print(f"{result['name']:<55} {p50:>10.2f} {throughput:>17.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inference and logging hot paths.")
+    parser.add_argument("--log-sizes", type=int, nargs="+", default=[1000, 100000],
+                        help="Synthetic log sizes (default: 1000 100000)")
+    parser.add_argument("--stores", nargs="+", choices=["jsonl", "sqlite"], default=["jsonl", "sqlite"])
+    parser.add_argument("--repeat", type=int, default=50, help="Base number of timed calls per benchmark")
+    parser.add_argument("--batch-size", type=int, default=32, help="Batch size for predict_images")
+    parser.add_argument("--skip-inference", action="store_true", help="Skip preprocessing and model benchmarks")
+    parser.add_argument("--skip-model", action="store_true", help="Benchmark preprocessing but not the model")
+    parser.add_argument("--skip-logging", action="store_true", help="Skip log and dashboard benchmarks")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare against an earlier JSON results file")
+    args = parser.parse_args(argv)
+
+    results = []
+    if not args.skip_inference:
+        results += bench_inference(args)
+    if not args.skip_logging:
+        results += bench_logging(args)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "model_backend": os.environ.get("MODEL_BACKEND", "keras"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
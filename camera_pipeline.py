@@ -0,0 +1,210 @@
+import threading
+import time
+from collections import deque
+
+from metrics import Metrics
+
+
+class _RateMeter:
+    """Measures events per second over a sliding time window."""
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self.events = deque()
+
+    def tick(self, now):
+        self.events.append(now)
+        while self.events and now - self.events[0] > self.window:
+            self.events.popleft()
+
+    def rate(self, now):
+        while self.events and now - self.events[0] > self.window:
+            self.events.popleft()
+        if len(self.events) < 2:
+            return 0.0
+        return (len(self.events) - 1) / max(self.events[-1] - self.events[0], 1e-6)
+
+
+class CameraPipeline:
+    """Producer/consumer pipeline for a live camera.
+
+    A capture thread keeps only the most recent frame from `capture` (anything
+    with a cv2.VideoCapture-like `read()`), and an inference thread always runs
+    `predict(frame)` on the newest frame, dropping any frames that arrived while
+    the model was busy. The caller's render loop reads `latest_frame()` and
+    `latest_result()` without ever waiting on the model. An optional
+    `metrics.Metrics` instance times the capture and predict stages. An
+    exception from `predict` is counted and kept in `error` until the next
+    successful inference (`consecutive_errors` counts failures in a row);
+    the thread carries on with the next frame.
+
+    Inferences are at least `min_interval` seconds apart, or as far apart
+    as `rate` (a `rate_control.AdaptiveRate`) decides after each one.
+    """
+
+    def __init__(self, capture, predict, min_interval=0.1, metrics=None, rate=None):
+        self.capture = capture
+        self.predict = predict
+        self.min_interval = min_interval
+        self.rate = rate
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._new_result = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+        self._running = False
+        self._threads = []
+
+        self._frame = None
+        self._frame_id = 0
+        self._frame_time = None
+        self._result = None
+
+        self.frames_read = 0
+        self.read_failures = 0
+        self.frames_inferred = 0
+        self.dropped_frames = 0
+        self.inference_errors = 0
+        self.consecutive_errors = 0
+        self.error = None
+        self.last_latency = None
+        self._capture_rate = _RateMeter()
+        self._inference_rate = _RateMeter()
+
+    def start(self):
+        """Start the capture and inference threads."""
+        self._running = True
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="camera-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="camera-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """Stop both threads and wait for them to exit."""
+        with self._lock:
+            self._running = False
+            self._stopping.set()
+            self._new_frame.notify_all()
+            self._new_result.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self):
+        return self._running
+
+    def _capture_loop(self):
+        while self._running:
+            with self.metrics.stage("capture"):
+                ret, frame = self.capture.read()
+            now = time.time()
+            if not ret:
+                self.read_failures += 1
+                self.metrics.increment("read_failures")
+                time.sleep(0.1)
+                continue
+
+            with self._lock:
+                self._frame = frame
+                self._frame_id += 1
+                self._frame_time = now
+                self.frames_read += 1
+                self._capture_rate.tick(now)
+                self._new_frame.notify()
+            self.metrics.increment("frames_read")
+
+    def _inference_loop(self):
+        last_id = 0
+        last_run = 0.0
+        while True:
+            with self._lock:
+                while self._running and self._frame_id == last_id:
+                    self._new_frame.wait(0.5)
+                if not self._running:
+                    return
+                frame, frame_id, captured_at = self._frame, self._frame_id, self._frame_time
+
+            # Keep the processing interval so the model doesn't run flat out
+            interval = self.rate.interval() if self.rate is not None else self.min_interval
+            wait = interval - (time.time() - last_run)
+            if wait > 0:
+                # Long idle intervals still end as soon as the pipeline is stopped
+                if self._stopping.wait(wait):
+                    return
+                with self._lock:
+                    frame, frame_id, captured_at = self._frame, self._frame_id, self._frame_time
+
+            last_run = time.time()
+            try:
+                with self.metrics.stage("predict"):
+                    result = self.predict(frame)
+            except Exception as e:
+                # Keep the thread alive and let the page decide whether to stop
+                self.metrics.increment("inference_errors")
+                with self._lock:
+                    self.inference_errors += 1
+                    self.consecutive_errors += 1
+                    self.error = e
+                    self._new_result.notify_all()
+                last_id = frame_id
+                continue
+            self.metrics.increment("frames_inferred")
+            now = time.time()
+            if self.rate is not None:
+                self.rate.update(frame, now - last_run, result, now)
+
+            with self._lock:
+                self.dropped_frames += frame_id - last_id - 1
+                self.frames_inferred += 1
+                self.consecutive_errors = 0
+                self.error = None
+                self.last_latency = now - captured_at
+                self._inference_rate.tick(now)
+                self._result = {
+                    "frame_id": frame_id,
+                    "frame": frame,
+                    "result": result,
+                    "captured_at": captured_at,
+                    "inferred_at": now,
+                }
+                self._new_result.notify_all()
+            last_id = frame_id
+
+    def latest_frame(self):
+        """Return `(frame_id, frame)` for the newest captured frame."""
+        with self._lock:
+            return self._frame_id, self._frame
+
+    def latest_result(self):
+        """Return the newest inference result dict, or None before the first one."""
+        with self._lock:
+            return self._result
+
+    def wait_for_result(self, frame_id, timeout):
+        """Wait up to `timeout` seconds for a result newer than `frame_id`; returns the newest result."""
+        with self._lock:
+            if self._running and (self._result is None or self._result["frame_id"] == frame_id):
+                self._new_result.wait(timeout)
+            return self._result
+
+    def stats(self):
+        """Return measured capture/inference FPS, frame counters and latency."""
+        now = time.time()
+        with self._lock:
+            return {
+                "capture_fps": self._capture_rate.rate(now),
+                "inference_fps": self._inference_rate.rate(now),
+                "frames_read": self.frames_read,
+                "frames_inferred": self.frames_inferred,
+                "dropped_frames": self.dropped_frames,
+                "read_failures": self.read_failures,
+                "inference_errors": self.inference_errors,
+                "latency_ms": self.last_latency * 1000 if self.last_latency is not None else None,
+                "interval": self.rate.interval() if self.rate is not None else self.min_interval,
+            }
@@ -0,0 +1,320 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from camera_pipeline import _RateMeter
+from cooldown import cooldown_key, get_cooldowns
+from detection_store import get_store, log_entry
+from metrics import Metrics, metrics
+from modular import predict_frames, warm_up
+from video_source import SampledVideoSource
+
+# Detections logged by the scheduler, same rule as the camera page
+LOG_CONFIDENCE = 0.95
+
+logger = logging.getLogger(__name__)
+
+
+def open_source(source, sample_fps=None):
+    """Open a device index ("0", 0), video file or stream URL as a capture."""
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        capture = cv2.VideoCapture(int(source))
+        capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+    return SampledVideoSource(source, sample_fps=sample_fps or 5.0)
+
+
+class _CameraFeed:
+    """Capture thread for one source that keeps only the newest frame."""
+
+    def __init__(self, name, capture, cooldown_key):
+        self.name = name
+        self.capture = capture
+        self.cooldown_key = cooldown_key
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        self.frame = None
+        self.frame_id = 0
+        self.frame_time = None
+        self.inferred_id = 0
+        self.last_inferred = 0.0
+        self.result = None
+
+        self.frames_read = 0
+        self.frames_inferred = 0
+        self.dropped_frames = 0
+        self.read_failures = 0
+        self.capture_rate = _RateMeter()
+        self.inference_rate = _RateMeter()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"camera-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(2.0)
+        self.capture.release()
+
+    @property
+    def finished(self):
+        return getattr(self.capture, "finished", False)
+
+    def _run(self):
+        while self.running and not self.finished:
+            ret, frame = self.capture.read()
+            now = time.time()
+            if not ret:
+                self.read_failures += 1
+                time.sleep(0.1)
+                continue
+            with self.lock:
+                self.frame = frame
+                self.frame_id += 1
+                self.frame_time = now
+                self.frames_read += 1
+                self.capture_rate.tick(now)
+
+
+class CameraScheduler:
+    """Runs several cameras from one process against the shared model.
+
+    Every source gets its own capture thread that keeps only its newest
+    frame. A single inference thread walks the cameras round-robin, takes
+    each camera's newest frame if its per-camera `frame_budget` (inferences
+    per second) allows, and runs up to `max_batch` frames from different
+    cameras through one model call. Per-camera latest results are published
+    under a version counter; readers call `wait_for_update()` to block
+    until something new arrives. A failed model call is counted and kept
+    in `error` until a call succeeds, and a failed log write is logged;
+    neither stops the loop.
+    """
+
+    def __init__(self, frame_budget=2.0, max_batch=8, log_detections=True, metrics=None):
+        self.frame_budget = frame_budget
+        self.max_batch = max_batch
+        self.log_detections = log_detections
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+
+        self._feeds = {}
+        self._order = []
+        self._next = 0
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+        self._version = 0
+        self._running = False
+        self._thread = None
+        self.cooldowns = get_cooldowns()
+        self.batches = 0
+        self.frames_batched = 0
+        self.inference_errors = 0
+        self.log_errors = 0
+        self.error = None
+
+    def add_source(self, name, source, sample_fps=None):
+        """Open and start a new camera; `source` is a device index, file path or URL."""
+        capture = open_source(source, sample_fps)
+        if not capture.isOpened():
+            raise RuntimeError(f"Couldn't open source {source!r} for camera {name!r}")
+        feed = _CameraFeed(name, capture, cooldown_key(source))
+        with self._lock:
+            if name in self._feeds:
+                capture.release()
+                raise ValueError(f"Camera {name!r} already exists")
+            self._feeds[name] = feed
+            self._order.append(name)
+        feed.start()
+        return feed
+
+    def remove_source(self, name):
+        with self._lock:
+            feed = self._feeds.pop(name, None)
+            if name in self._order:
+                self._order.remove(name)
+        if feed is not None:
+            feed.stop()
+
+    def cameras(self):
+        with self._lock:
+            return list(self._order)
+
+    def start(self):
+        if self._running:
+            return self
+        warm_up()
+        self.error = None
+        self._running = True
+        self._thread = threading.Thread(target=self._inference_loop, name="camera-scheduler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        with self._lock:
+            self._updated.notify_all()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        for name in self.cameras():
+            self.remove_source(name)
+
+    @property
+    def running(self):
+        return self._running
+
+    def _pick_batch(self, now):
+        """Take up to `max_batch` fresh frames, fairly, starting after the last served camera."""
+        batch = []
+        with self._lock:
+            count = len(self._order)
+            for step in range(count):
+                name = self._order[(self._next + step) % count]
+                feed = self._feeds[name]
+                with feed.lock:
+                    fresh = feed.frame_id != feed.inferred_id
+                    due = self.frame_budget <= 0 or now - feed.last_inferred >= 1.0 / self.frame_budget
+                    if fresh and due:
+                        feed.dropped_frames += feed.frame_id - feed.inferred_id - 1
+                        feed.inferred_id = feed.frame_id
+                        feed.last_inferred = now
+                        batch.append((feed, feed.frame, feed.frame_id, feed.frame_time))
+                if len(batch) == self.max_batch:
+                    self._next = (self._next + step + 1) % count
+                    break
+            else:
+                if count:
+                    self._next = (self._next + 1) % count
+        return batch
+
+    def _inference_loop(self):
+        try:
+            while self._running:
+                self._run_batch()
+        finally:
+            # If the thread ever ends, say so: readers loop on `running`
+            self._running = False
+            with self._lock:
+                self._updated.notify_all()
+
+    def _run_batch(self):
+        now = time.time()
+        batch = self._pick_batch(now)
+        if not batch:
+            time.sleep(0.01)
+            return
+
+        try:
+            with self.metrics.stage("scheduler_batch"):
+                results = predict_frames([frame for _, frame, _, _ in batch])
+        except Exception as e:
+            # The frames are dropped; the next batch tries again
+            self.inference_errors += 1
+            self.metrics.increment("inference_errors")
+            self.error = e
+            logger.exception("Scheduler model call failed")
+            with self._lock:
+                self._version += 1
+                self._updated.notify_all()
+            return
+        done = time.time()
+        self.error = None
+        self.batches += 1
+        self.frames_batched += len(batch)
+        self.metrics.increment("scheduler_frames", len(batch))
+
+        for (feed, frame, frame_id, captured_at), result in zip(batch, results):
+            with feed.lock:
+                feed.frames_inferred += 1
+                feed.inference_rate.tick(done)
+                feed.result = {
+                    "camera": feed.name,
+                    "frame_id": frame_id,
+                    "frame": frame,
+                    "result": result,
+                    "captured_at": captured_at,
+                    "inferred_at": done,
+                    "latency_ms": (done - captured_at) * 1000,
+                }
+            if self.log_detections:
+                self._log(feed, result)
+
+        with self._lock:
+            self._version += 1
+            self._updated.notify_all()
+
+    def _log(self, feed, result):
+        # Keyed by source, not camera name, so the Home page shares the same cooldown window
+        class_name, category, confidence_score = result
+        if not class_name or confidence_score < LOG_CONFIDENCE:
+            return
+        if not self.cooldowns.check_and_set(feed.cooldown_key, class_name, category)[0]:
+            return
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            log_entry(class_name, category, confidence_score, timestamp, store=get_store())
+        except Exception:
+            # Let the next frame try again rather than stopping every camera
+            self.cooldowns.release(feed.cooldown_key, class_name)
+            self.log_errors += 1
+            self.metrics.increment("log_errors")
+            logger.exception("Couldn't log %s from camera %s", class_name, feed.name)
+
+    def wait_for_update(self, since_version, timeout=1.0):
+        """Block until results newer than `since_version` exist; returns the current version."""
+        with self._lock:
+            if self._version == since_version and self._running:
+                self._updated.wait(timeout)
+            return self._version
+
+    def latest_results(self):
+        """Return `{camera: latest result dict or None}`."""
+        with self._lock:
+            feeds = [self._feeds[name] for name in self._order]
+        results = {}
+        for feed in feeds:
+            with feed.lock:
+                results[feed.name] = feed.result
+        return results
+
+    def mean_batch_size(self):
+        return self.frames_batched / self.batches if self.batches else 0.0
+
+    def stats(self):
+        """Per-camera capture/inference rates and counters."""
+        now = time.time()
+        with self._lock:
+            feeds = [self._feeds[name] for name in self._order]
+        stats = {}
+        for feed in feeds:
+            with feed.lock:
+                stats[feed.name] = {
+                    "capture_fps": feed.capture_rate.rate(now),
+                    "inference_fps": feed.inference_rate.rate(now),
+                    "frames_read": feed.frames_read,
+                    "frames_inferred": feed.frames_inferred,
+                    "dropped_frames": feed.dropped_frames,
+                    "read_failures": feed.read_failures,
+                    "finished": feed.finished,
+                }
+        return stats
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler shared by every Streamlit session."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = CameraScheduler(metrics=metrics)
+        return _scheduler
@@ -0,0 +1,88 @@
+import streamlit as st
+from camera_scheduler import get_scheduler
+from frame_renderer import FrameRenderer
+
+# Title and description
+st.title("Multi-Camera Monitoring")
+st.write("Several cameras share one model in this server process. Confident detections "
+         "(above 95%) are logged once per cooldown window, per source and species.")
+
+scheduler = get_scheduler()
+
+# Sources, one per line as name=source (a device index, video file or stream URL)
+with st.sidebar:
+    st.header("Cameras")
+    sources_text = st.text_area("Sources (one per line, name=source)", "cam0=0",
+                                help="e.g. cam0=0, gate=rtsp://192.168.1.20/stream, trail=videos/trail.mp4")
+    scheduler.frame_budget = st.number_input("Inferences per second, per camera", min_value=0.1, max_value=30.0,
+                                             value=float(scheduler.frame_budget))
+    scheduler.max_batch = st.number_input("Max frames per model call", min_value=1, max_value=64,
+                                          value=int(scheduler.max_batch))
+    col1, col2 = st.columns(2)
+    start = col1.button("Start")
+    stop = col2.button("Stop")
+
+if stop:
+    scheduler.stop()
+
+if start:
+    for line in sources_text.splitlines():
+        if "=" not in line:
+            continue
+        name, source = (part.strip() for part in line.split("=", 1))
+        if name in scheduler.cameras():
+            continue
+        try:
+            scheduler.add_source(name, source)
+        except (RuntimeError, ValueError) as e:
+            st.error(str(e))
+    try:
+        with st.spinner("Loading model..."):
+            scheduler.start()
+    except Exception as e:
+        st.error(f"Model couldn't be loaded: {e}")
+        st.stop()
+
+cameras = scheduler.cameras()
+if not scheduler.running or not cameras:
+    st.info("No cameras running. Add sources in the sidebar and press Start.")
+    st.stop()
+
+# One tile per camera: frame, latest label and rates
+columns = st.columns(min(len(cameras), 3))
+tiles = {}
+for i, name in enumerate(cameras):
+    with columns[i % len(columns)]:
+        st.subheader(name)
+        # Tiles are small, so send small JPEGs at a modest rate
+        tiles[name] = (FrameRenderer(st.empty(), width=320, max_fps=5), st.empty(), st.empty())
+summary_placeholder = st.empty()
+
+# Redraw whenever the scheduler publishes new results
+version = 0
+while scheduler.running:
+    version = scheduler.wait_for_update(version, timeout=1.0)
+    if scheduler.error is not None:
+        st.error(f"Prediction failed: {scheduler.error}")
+        break
+    results = scheduler.latest_results()
+    stats = scheduler.stats()
+    for name, (renderer, label_placeholder, stats_placeholder) in tiles.items():
+        latest = results.get(name)
+        if latest is None:
+            continue
+        renderer.render(latest["frame_id"], latest["frame"])
+        class_name, category, confidence_score = latest["result"]
+        if class_name:
+            label_placeholder.markdown(f"**{class_name}** · {category} · {confidence_score * 100:.2f}%")
+        else:
+            label_placeholder.markdown("No animal detected")
+        camera_stats = stats.get(name, {})
+        stats_placeholder.caption(
+            f"Capture: {camera_stats.get('capture_fps', 0):.1f} FPS · "
+            f"Inference: {camera_stats.get('inference_fps', 0):.1f} FPS · "
+            f"Dropped: {camera_stats.get('dropped_frames', 0)} · Latency: {latest['latency_ms']:.0f} ms"
+        )
+    summary_placeholder.caption(f"Model calls: {scheduler.batches} · "
+                                f"Average batch: {scheduler.mean_batch_size():.1f} frames" +
+                                (f" · Failed log writes: {scheduler.log_errors}" if scheduler.log_errors else ""))
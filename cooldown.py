@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds before the same species from the same source is logged again
+DEFAULT_COOLDOWN = 30
+
+# Per conservation category overrides, e.g. {"EN(G1)": 10, "LC(G5)": 120}
+CATEGORY_COOLDOWNS = {}
+
+# Where the cooldowns are kept across restarts
+COOLDOWN_FILE = "logs/cooldowns.json"
+
+
+def cooldown_key(source):
+    """Cooldown key of a capture source, the same on every page.
+
+    A device index becomes "camera:<n>", anything else (file path, URL)
+    is its own key, so one physical camera has one cooldown window.
+    """
+    if isinstance(source, int) or (isinstance(source, str) and source.strip().isdigit()):
+        return f"camera:{int(source)}"
+    return str(source)
+
+
+class CooldownTracker:
+    """Process-wide cooldown / dedup map keyed by (source, species).
+
+    `check_and_set()` decides and records a detection under one lock, so
+    two sessions (or threads) seeing the same animal log it only once.
+    Entries expire after their category's window and the map never holds
+    more than `max_entries` keys (oldest evicted first). With `path`, the
+    map is saved on every change and reloaded on start, so a restart
+    doesn't log the same animal again.
+    """
+
+    def __init__(self, default_seconds=DEFAULT_COOLDOWN, category_seconds=None, max_entries=10000, path=None):
+        self.default_seconds = default_seconds
+        self.category_seconds = dict(CATEGORY_COOLDOWNS if category_seconds is None else category_seconds)
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> (logged_at, expires_at), oldest first
+        self._entries = OrderedDict()
+        if path:
+            self._load()
+
+    def window(self, category=None):
+        return self.category_seconds.get(category, self.default_seconds)
+
+    @staticmethod
+    def _key(source, class_name):
+        return f"{source}|{class_name}"
+
+    def _remaining(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        if entry[1] <= now:
+            del self._entries[key]
+            return 0.0
+        return entry[1] - now
+
+    def remaining(self, source, class_name, now=None):
+        """Seconds left before this species from this source can be logged again (0 if it can)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._remaining(self._key(source, class_name), now)
+
+    def check_and_set(self, source, class_name, category=None, now=None):
+        """Atomically claim a log slot; returns `(allowed, remaining_seconds)`."""
+        now = time.time() if now is None else now
+        key = self._key(source, class_name)
+        with self._lock:
+            remaining = self._remaining(key, now)
+            if remaining > 0:
+                return False, remaining
+
+            self._entries[key] = (now, now + self.window(category))
+            self._entries.move_to_end(key)
+            self._evict(now)
+            if self.path:
+                self._save()
+        return True, 0.0
+
+    def release(self, source, class_name):
+        """Forget an entry, e.g. when logging the claimed detection failed."""
+        with self._lock:
+            if self._entries.pop(self._key(source, class_name), None) is not None and self.path:
+                self._save()
+
+    def _evict(self, now):
+        for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for key, (logged_at, expires_at) in sorted(saved.items(), key=lambda item: item[1][0]):
+            if expires_at > now:
+                self._entries[key] = (logged_at, expires_at)
+        self._evict(now)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_cooldowns():
+    """Return the process-wide tracker, persisted to COOLDOWN_FILE."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = CooldownTracker(path=COOLDOWN_FILE)
+        return _tracker
@@ -0,0 +1,265 @@
+import csv
+import sqlite3
+import threading
+from datetime import timedelta
+
+import pandas as pd
+
+from detection_store import SqliteDetectionStore, get_store
+
+# Sidecar index for the JSON Lines store (the SQLite store indexes itself)
+INDEX_SUFFIX = ".index.sqlite"
+
+# Group-by expressions over the hourly rollup table
+BUCKETS = {
+    "hour": "hour",
+    "day": "substr(hour, 1, 10)",
+    "species": "class_name",
+    "category": "category",
+    "confidence": "confidence_pct",
+}
+
+_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS detections ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "timestamp TEXT NOT NULL, "
+    "class_name TEXT NOT NULL, "
+    "category TEXT, "
+    "confidence_score REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS detections_timestamp ON detections (timestamp)",
+    "CREATE INDEX IF NOT EXISTS detections_species ON detections (class_name, timestamp)",
+    "CREATE INDEX IF NOT EXISTS detections_category ON detections (category, timestamp)",
+    # Counts per hour / species / category / whole confidence percent
+    "CREATE TABLE IF NOT EXISTS detection_rollup ("
+    "hour TEXT NOT NULL, "
+    "class_name TEXT NOT NULL, "
+    "category TEXT NOT NULL, "
+    "confidence_pct INTEGER NOT NULL, "
+    "count INTEGER NOT NULL, "
+    "confidence_sum REAL NOT NULL, "
+    "PRIMARY KEY (hour, class_name, category, confidence_pct))",
+    "CREATE TABLE IF NOT EXISTS index_state (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+]
+
+_ROLLUP_UPSERT = (
+    "INSERT INTO detection_rollup (hour, class_name, category, confidence_pct, count, confidence_sum) "
+    "VALUES (substr(?, 1, 13), ?, IFNULL(?, ''), CAST(? * 100 AS INTEGER), ?, ?) "
+    "ON CONFLICT (hour, class_name, category, confidence_pct) "
+    "DO UPDATE SET count = count + excluded.count, confidence_sum = confidence_sum + excluded.confidence_sum"
+)
+
+
+def _where(start_date=None, end_date=None, category=None, min_confidence=None, species=None, rollup=False):
+    """SQL conditions and parameters for the dashboard filters (dates are inclusive)."""
+    time_column = "hour" if rollup else "timestamp"
+    conditions, params = [], []
+    if start_date is not None:
+        conditions.append(f"{time_column} >= ?")
+        params.append(start_date.isoformat())
+    if end_date is not None:
+        conditions.append(f"{time_column} < ?")
+        params.append((end_date + timedelta(days=1)).isoformat())
+    if category is not None:
+        conditions.append("category = ?")
+        params.append(category)
+    if species is not None:
+        conditions.append("class_name = ?")
+        params.append(species)
+    if min_confidence is not None:
+        conditions.append("confidence_pct >= ?" if rollup else "confidence_score * 100 >= ?")
+        params.append(min_confidence)
+    return (" WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+class DetectionIndex:
+    """Indexed, queryable view of a detection store.
+
+    Rows are indexed by timestamp, species and category, and every new row
+    also updates an hourly rollup (per species, category and whole
+    confidence percent), so counts per hour/day/species and confidence
+    histograms never scan raw rows. `refresh()` ingests only the records
+    appended since the last call. For the SQLite store the indexes live in
+    the store's own database; the JSON Lines store gets a sidecar SQLite
+    file next to it. Row queries are paginated, so a page of the table is
+    all that gets materialized. Rows that retention has downsampled leave
+    the table but stay counted in the rollup.
+    """
+
+    def __init__(self, store=None, path=None):
+        self.store = store or get_store()
+        self.copy_rows = not isinstance(self.store, SqliteDetectionStore)
+        self.path = path or (self.store.path + INDEX_SUFFIX if self.copy_rows else self.store.path)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _offset(self, conn):
+        row = conn.execute("SELECT value FROM index_state WHERE key = 'offset'").fetchone()
+        return row[0] if row else 0
+
+    def refresh(self):
+        """Index records appended to the store since the last call; returns how many were added."""
+        with self._lock:
+            conn = self._connect()
+            offset = self._offset(conn)
+            entries, new_offset = self.store.read_since(offset)
+            reset = new_offset < offset or offset == 0
+            if reset:
+                # First build, or the store was replaced or truncated: rebuild from the start
+                entries, new_offset = self.store.read_since(0)
+            if not entries and not reset:
+                return 0
+
+            rows = [
+                (e["timestamp"], e["class_name"], e.get("category"), float(e["confidence_score"]))
+                for e in entries
+            ]
+            with conn:
+                if reset:
+                    conn.execute("DELETE FROM detection_rollup")
+                    conn.execute("DELETE FROM index_state WHERE key LIKE 'pruned:%'")
+                    if self.copy_rows:
+                        conn.execute("DELETE FROM detections")
+                    conn.executemany(_ROLLUP_UPSERT, self._summary_rows())
+                if self.copy_rows:
+                    conn.executemany(
+                        "INSERT INTO detections (timestamp, class_name, category, confidence_score) VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                conn.executemany(_ROLLUP_UPSERT, [row + (1, row[3]) for row in rows])
+                conn.execute("INSERT OR REPLACE INTO index_state (key, value) VALUES ('offset', ?)", (new_offset,))
+            return len(rows)
+
+    def _summary_rows(self):
+        # Days already downsampled by retention only survive as daily summaries:
+        # they go back into the rollup at hour 00, at their mean confidence
+        from retention import read_summaries
+
+        return [
+            (s["date"] + " 00", s["class_name"], s.get("category"), s["confidence_sum"] / s["count"],
+             s["count"], s["confidence_sum"])
+            for s in read_summaries(self.store) if s.get("count")
+        ]
+
+    def prune(self, source, entries):
+        """Drop the indexed rows of `entries`, the records retention folded from `source`.
+
+        Exactly those records go, one indexed row each, not everything up to
+        a date: a segment that also holds newer records stays in the store
+        and in the table. Each source is pruned once, so a repeated run after
+        an interruption doesn't remove identical records kept elsewhere. The
+        rollup keeps counting them.
+        """
+        if not self.copy_rows:
+            # The SQLite store's own rows are the index; retention deletes them there
+            return 0
+        key = "pruned:" + source
+        with self._lock:
+            with self._connect() as conn:
+                if conn.execute("SELECT 1 FROM index_state WHERE key = ?", (key,)).fetchone():
+                    return 0
+                pruned = 0
+                for e in entries:
+                    pruned += conn.execute(
+                        "DELETE FROM detections WHERE id = (SELECT id FROM detections WHERE timestamp = ? "
+                        "AND class_name = ? AND category IS ? AND confidence_score = ? LIMIT 1)",
+                        (e["timestamp"], e["class_name"], e.get("category"), float(e["confidence_score"]))
+                    ).rowcount
+                conn.execute("INSERT INTO index_state (key, value) VALUES (?, ?)", (key, pruned))
+                return pruned
+
+    def date_bounds(self):
+        """First and last day with detections, or (None, None)."""
+        first, last = self._connect().execute("SELECT MIN(hour), MAX(hour) FROM detection_rollup").fetchone()
+        if first is None:
+            return None, None
+        return pd.Timestamp(first[:10]).date(), pd.Timestamp(last[:10]).date()
+
+    def categories(self):
+        rows = self._connect().execute("SELECT DISTINCT category FROM detection_rollup ORDER BY category").fetchall()
+        return [row[0] for row in rows if row[0]]
+
+    def summary(self, **filters):
+        """Total detections, unique species and mean confidence (percent) for the filters."""
+        where, params = _where(rollup=True, **filters)
+        total, unique_species, confidence_sum = self._connect().execute(
+            f"SELECT SUM(count), COUNT(DISTINCT class_name), SUM(confidence_sum) FROM detection_rollup{where}", params
+        ).fetchone()
+        total = total or 0
+        return total, unique_species, confidence_sum * 100 / total if total else None
+
+    def counts(self, by="day", **filters):
+        """Detections per `by` bucket ("hour", "day", "species", "category" or "confidence")."""
+        expression = BUCKETS[by]
+        where, params = _where(rollup=True, **filters)
+        order = "count DESC" if by in ("species", "category") else "bucket"
+        return pd.read_sql_query(
+            f"SELECT {expression} AS bucket, SUM(count) AS count FROM detection_rollup{where} "
+            f"GROUP BY bucket ORDER BY {order}",
+            self._connect(), params=params
+        ).rename(columns={"bucket": by})
+
+    def confidence_histogram(self, **filters):
+        """Detections per whole confidence percent."""
+        return self.counts("confidence", **filters)
+
+    def row_count(self, **filters):
+        """Raw detections matching the filters: what `rows()` and `export_csv()` can list.
+
+        Lower than the `summary()` total once retention has folded old days into daily summaries.
+        """
+        where, params = _where(**filters)
+        return self._connect().execute(f"SELECT COUNT(*) FROM detections{where}", params).fetchone()[0]
+
+    def rows(self, limit=100, offset=0, **filters):
+        """One page of matching rows, newest first."""
+        where, params = _where(**filters)
+        return pd.read_sql_query(
+            f"SELECT timestamp, class_name, category, confidence_score FROM detections{where} "
+            f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            self._connect(), params=params + [limit, offset]
+        )
+
+    def first_timestamp(self):
+        """Timestamp of the oldest raw row, or None; anything older was folded by retention."""
+        return self._connect().execute("SELECT MIN(timestamp) FROM detections").fetchone()[0]
+
+    def export_csv(self, sink, chunk_size=10000, header=True, **filters):
+        """Write all matching rows to a text file object as CSV, oldest first, in chunks."""
+        where, params = _where(**filters)
+        cursor = self._connect().execute(
+            f"SELECT timestamp, class_name, category, confidence_score FROM detections{where} ORDER BY timestamp, id",
+            params
+        )
+        writer = csv.writer(sink)
+        if header:
+            writer.writerow(["timestamp", "class_name", "category", "confidence_score"])
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            writer.writerows(rows)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(store=None):
+    """Return the process-wide index of `store` (the default detection store if omitted)."""
+    store = store or get_store()
+    with _indexes_lock:
+        if store.path not in _indexes:
+            _indexes[store.path] = DetectionIndex(store)
+        return _indexes[store.path]
@@ -0,0 +1,464 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still single writes, just without a file lock
+    fcntl = None
+
+# Legacy log file (one JSON array rewritten on every detection)
+LEGACY_LOG_FILE = "logs/detection_logs.json"
+
+# Append-only log files
+JSONL_LOG_FILE = "logs/detection_logs.jsonl"
+SQLITE_LOG_FILE = "logs/detection_logs.sqlite"
+
+# Rotation of the JSON Lines log: by size and/or by period ("day", "month" or "none")
+ROTATE_MAX_BYTES = int(os.environ.get("DETECTION_LOG_MAX_BYTES", 64 * 1024 * 1024))
+ROTATE_EVERY = os.environ.get("DETECTION_LOG_ROTATE", "month")
+SEGMENTS_SUFFIX = ".segments.json"
+
+# Backend used by app.py and logs.py ("jsonl" or "sqlite")
+DETECTION_STORE = os.environ.get("DETECTION_STORE", "jsonl")
+
+
+def _make_entry(timestamp, class_name, category, confidence_score):
+    return {
+        "timestamp": timestamp,
+        "class_name": class_name,
+        "category": category,
+        "confidence_score": float(confidence_score)
+    }
+
+
+def encode_line(record):
+    """One JSON Lines record followed by a tab and its CRC32, so a damaged line is detected."""
+    payload = json.dumps(record).encode("utf-8")
+    return payload + b"\t%08x\n" % zlib.crc32(payload)
+
+
+def decode_line(line):
+    """Parse a line written by `encode_line` (or a plain JSON line); None if it is damaged."""
+    payload, tab, checksum = line.rstrip(b"\n").rpartition(b"\t")
+    if not tab:
+        payload = checksum
+    elif checksum != b"%08x" % zlib.crc32(payload):
+        return None
+    try:
+        return json.loads(payload)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+
+def _period(timestamp, rotate_every):
+    return {"day": timestamp[:10], "month": timestamp[:7]}.get(rotate_every)
+
+
+class JsonlDetectionStore:
+    """Detections stored as one JSON object per line.
+
+    Appends are a single `write` on a file opened with O_APPEND (plus an
+    exclusive lock where available), so they cost O(1) and concurrent
+    writers never overwrite each other. Every line carries a CRC32, and an
+    append after a torn write starts on a fresh line, so a crash mid-write
+    only loses that one record.
+
+    The active file is rotated into numbered segments once it reaches
+    `max_bytes` or a new `rotate_every` period ("day", "month" or "none")
+    starts. Segments are listed in `<path>.segments.json` with the offset
+    they start at, so offsets keep growing across rotations and readers
+    resume with `read_since` as before.
+    """
+
+    def __init__(self, path=JSONL_LOG_FILE, max_bytes=ROTATE_MAX_BYTES, rotate_every=ROTATE_EVERY):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_every = rotate_every
+        self.manifest_path = path + SEGMENTS_SUFFIX
+        self._lock_path = path + ".lock"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            open(path, "a").close()
+
+    def segments(self):
+        """Rotated segments, oldest first: dicts with path, base, size, first, last, summarized."""
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)["segments"]
+        except FileNotFoundError:
+            return []
+
+    def _segment_path(self, segment):
+        return os.path.join(os.path.dirname(self.path), segment["path"])
+
+    def _write_segments(self, segments):
+        directory, name = os.path.split(self.manifest_path)
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"segments": segments}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    @contextlib.contextmanager
+    def _segments_lock(self, exclusive):
+        # Held while the segment list changes (exclusive) or segments are being opened (shared)
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    def _open_active(self):
+        """Open and lock the active file, retrying if it was rotated away meanwhile."""
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.path.samestat(os.fstat(fd), os.stat(self.path)):
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _read_at(self, fd, start, length):
+        os.lseek(fd, start, os.SEEK_SET)
+        return os.read(fd, length)
+
+    def _first_timestamp(self, fd):
+        entry = decode_line(self._read_at(fd, 0, 4096).split(b"\n", 1)[0])
+        return entry.get("timestamp") if isinstance(entry, dict) else None
+
+    def _last_timestamp(self, fd, size):
+        for line in reversed(self._read_at(fd, max(0, size - 4096), 4096).split(b"\n")):
+            entry = decode_line(line)
+            if isinstance(entry, dict) and "timestamp" in entry:
+                return entry["timestamp"]
+        return None
+
+    def _rotate(self, fd, size):
+        """Move the (locked) active file to a new segment."""
+        with self._segments_lock(exclusive=True):
+            segments = self.segments()
+            base = segments[-1]["base"] + segments[-1]["size"] if segments else 0
+            stem, ext = os.path.splitext(os.path.basename(self.path))
+            segment = {
+                "path": f"{stem}.{len(segments):05d}{ext}",
+                "base": base,
+                "size": size,
+                "first": self._first_timestamp(fd),
+                "last": self._last_timestamp(fd, size),
+                "summarized": False,
+            }
+            os.rename(self.path, self._segment_path(segment))
+            self._write_segments(segments + [segment])
+
+    def _write(self, data, timestamp):
+        fd = self._open_active()
+        try:
+            size = os.fstat(fd).st_size
+            period = _period(timestamp, self.rotate_every)
+            first = self._first_timestamp(fd) if size and period else None
+            # Only a later period rotates; back-dated records (e.g. batch imports) join the active file
+            if first and period > _period(first, self.rotate_every):
+                self._rotate(fd, size)
+                os.close(fd)
+                fd = self._open_active()
+                size = os.fstat(fd).st_size
+            if size and self._read_at(fd, size - 1, 1) != b"\n":
+                # A torn write left a partial line: end it so only that record is lost
+                data = b"\n" + data
+            os.write(fd, data)
+            if self.max_bytes and size + len(data) >= self.max_bytes:
+                self._rotate(fd, size + len(data))
+        finally:
+            os.close(fd)
+
+    def rotate(self):
+        """Rotate the active file now (if it has any records)."""
+        fd = self._open_active()
+        try:
+            size = os.fstat(fd).st_size
+            if size:
+                self._rotate(fd, size)
+        finally:
+            os.close(fd)
+
+    def drop_segment(self, segment):
+        """Delete a rotated segment's file, keeping its place (and offsets) in the segment list."""
+        with self._segments_lock(exclusive=True):
+            segments = self.segments()
+            for listed in segments:
+                if listed["path"] == segment["path"]:
+                    listed["summarized"] = True
+            self._write_segments(segments)
+            try:
+                os.remove(self._segment_path(segment))
+            except FileNotFoundError:
+                pass
+
+    def expired_batches(self, cutoff):
+        """Yield `(key, entries, drop)` for each rotated segment whose records are all older than `cutoff`."""
+        for segment in self.segments():
+            if segment["summarized"] or not segment["last"] or segment["last"] >= cutoff:
+                continue
+            with open(self._segment_path(segment), "rb") as f:
+                entries, _ = self._read_file(f, segment["base"], segment["base"], final=True)
+            if any(entry.get("timestamp", "") >= cutoff for entry in entries):
+                continue
+            yield segment["path"], entries, lambda segment=segment: self.drop_segment(segment)
+
+    def append(self, entry):
+        self._write(encode_line(entry), entry.get("timestamp", ""))
+
+    def append_many(self, entries):
+        lines = b"".join(encode_line(entry) for entry in entries)
+        if not lines:
+            return
+        self._write(lines, entries[0].get("timestamp", ""))
+
+    def _read_file(self, f, base, offset, final):
+        entries = []
+        f.seek(offset - base)
+        for line in f:
+            if not line.endswith(b"\n") and not final:
+                break
+            offset += len(line)
+            entry = decode_line(line)
+            if entry is not None:
+                entries.append(entry)
+        return entries, offset
+
+    def read_since(self, offset=0):
+        """Return `(entries, new_offset)` for records written after `offset`.
+
+        Offsets run across rotated segments. A trailing line without a
+        newline (a write in progress) is left for the next call, and damaged
+        lines are skipped. If the store no longer reaches `offset` (replaced
+        or truncated), `([], 0)` is returned so the caller knows to reload
+        from the start.
+        """
+        # Open every file needed under the lock; rotation renames files but never changes their content
+        files, active, base = [], None, 0
+        with self._segments_lock(exclusive=False):
+            for segment in self.segments():
+                base = segment["base"] + segment["size"]
+                if base > offset and not segment["summarized"]:
+                    try:
+                        files.append((open(self._segment_path(segment), "rb"), segment["base"], True))
+                    except FileNotFoundError:
+                        continue
+            if os.path.exists(self.path):
+                active = open(self.path, "rb")
+                files.append((active, base, False))
+
+        try:
+            if base + (os.fstat(active.fileno()).st_size if active else 0) < offset:
+                return [], 0
+            entries = []
+            for f, file_base, final in files:
+                chunk, file_end = self._read_file(f, file_base, max(offset, file_base), final)
+                entries.extend(chunk)
+                offset = file_end
+            return entries, offset
+        finally:
+            for f, _, _ in files:
+                f.close()
+
+    def read_all(self):
+        return self.read_since(0)[0]
+
+    def count(self):
+        return len(self.read_all())
+
+    def validate_tail(self, tail_bytes=64 * 1024):
+        """Check the checksums of the last `tail_bytes` of the active file.
+
+        Only the tail is read, so this costs the same at any history size.
+        A torn last line is terminated so the next append starts cleanly.
+        Returns a dict with the records checked, damaged lines and whether
+        the file ended in a torn write.
+        """
+        fd = self._open_active()
+        try:
+            size = os.fstat(fd).st_size
+            start = max(0, size - tail_bytes)
+            data = self._read_at(fd, start, size - start)
+            if start:
+                # The first line of the window is probably cut; start at the next one
+                data = data[data.find(b"\n") + 1:] if b"\n" in data else b""
+            lines = data.split(b"\n")
+            torn = bool(lines[-1])
+            if torn:
+                os.write(fd, b"\n")
+            complete = [line for line in lines[:-1] if line]
+            damaged = sum(1 for line in complete if decode_line(line) is None)
+            return {"checked": len(complete) - damaged, "damaged": damaged + torn, "torn": torn}
+        finally:
+            os.close(fd)
+
+
+class SqliteDetectionStore:
+    """Detections stored in SQLite in WAL mode.
+
+    WAL lets the dashboard read while the camera page writes, and SQLite
+    serializes concurrent writers. Reads can resume from a rowid.
+    """
+
+    def __init__(self, path=SQLITE_LOG_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS detections ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "timestamp TEXT NOT NULL, "
+                "class_name TEXT NOT NULL, "
+                "category TEXT, "
+                "confidence_score REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, entry):
+        self.append_many([entry])
+
+    def append_many(self, entries):
+        rows = [
+            (e["timestamp"], e["class_name"], e.get("category"), float(e["confidence_score"]))
+            for e in entries
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO detections (timestamp, class_name, category, confidence_score) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def read_since(self, offset=0):
+        """Return `(entries, new_offset)` for rows with a rowid above `offset`.
+
+        If the table no longer reaches `offset` (database recreated),
+        `([], 0)` is returned so the caller knows to reload from the start.
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, timestamp, class_name, category, confidence_score FROM detections WHERE id > ? ORDER BY id",
+            (offset,)
+        ).fetchall()
+        if not rows:
+            # The AUTOINCREMENT counter, not MAX(id): expired rows may have been deleted
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'detections'").fetchone()
+            last_id = row[0] if row else 0
+            return [], offset if last_id >= offset else 0
+        entries = [_make_entry(*row[1:]) for row in rows]
+        return entries, rows[-1][0]
+
+    def read_all(self):
+        return self.read_since(0)[0]
+
+    def count(self):
+        return self._connect().execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+
+    def expired_batches(self, cutoff):
+        """Yield `(key, entries, drop)` per day for the rows older than `cutoff`.
+
+        The key is the day and its first row id. A run interrupted before
+        `drop()` finds the same rows, so the same key, and doesn't summarize
+        them twice, even if newer rows expired meanwhile.
+        """
+        conn = self._connect()
+        days = conn.execute(
+            "SELECT substr(timestamp, 1, 10) AS day, MIN(id), MAX(id) FROM detections WHERE timestamp < ? "
+            "GROUP BY day ORDER BY day",
+            (cutoff,)
+        ).fetchall()
+        for day, first_id, last_id in days:
+            rows = conn.execute(
+                "SELECT timestamp, class_name, category, confidence_score FROM detections "
+                "WHERE timestamp >= ? AND timestamp < ? AND id BETWEEN ? AND ? ORDER BY id",
+                (day, day + "~", first_id, last_id)
+            ).fetchall()
+
+            def drop(day=day, first_id=first_id, last_id=last_id):
+                with self._connect() as conn:
+                    conn.execute(
+                        "DELETE FROM detections WHERE timestamp >= ? AND timestamp < ? AND id BETWEEN ? AND ?",
+                        (day, day + "~", first_id, last_id)
+                    )
+
+            yield f"rows:{day}:{first_id}", [_make_entry(*row) for row in rows], drop
+
+
+def migrate_legacy_log(store, legacy_path=LEGACY_LOG_FILE):
+    """Move entries from the old JSON array log into `store` (runs once).
+
+    The legacy file is renamed to `<name>.migrated` afterwards, so later
+    calls only cost a failed rename. Returns the number of migrated entries.
+    """
+    # Claim the file first so two processes starting together don't both migrate it
+    migrating_path = legacy_path + ".migrating"
+    try:
+        os.rename(legacy_path, migrating_path)
+    except FileNotFoundError:
+        return 0
+
+    try:
+        with open(migrating_path, "r") as f:
+            file_content = f.read().strip()
+            logs = json.loads(file_content) if file_content else []
+    except json.JSONDecodeError:
+        logs = []
+
+    entries = [
+        _make_entry(log["timestamp"], log["class_name"], log.get("category"), log["confidence_score"])
+        for log in logs
+        if isinstance(log, dict) and {"timestamp", "class_name", "confidence_score"} <= log.keys()
+    ]
+    store.append_many(entries)
+    os.replace(migrating_path, legacy_path + ".migrated")
+    return len(entries)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(backend=DETECTION_STORE):
+    """Return the process-wide detection store, migrating the legacy log on first use.
+
+    The JSON Lines store's tail is checked on first use as well, which reads
+    a fixed amount however long the history is.
+    """
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == "jsonl":
+                store = JsonlDetectionStore()
+                store.validate_tail()
+            elif backend == "sqlite":
+                store = SqliteDetectionStore()
+            else:
+                raise ValueError(f"Unknown detection store: {backend}")
+            migrate_legacy_log(store)
+            _stores[backend] = store
+        return _stores[backend]
+
+
+def log_entry(class_name, category, confidence_score, timestamp, store=None):
+    """Append one detection to the store and return the stored entry."""
+    entry = _make_entry(timestamp, class_name, category, confidence_score)
+    (store or get_store()).append(entry)
+    return entry
@@ -0,0 +1,32 @@
+import streamlit as st
+from metrics import metrics, show_diagnostics
+
+# Title and description
+st.title("Detection Loop Diagnostics")
+st.write("Per-stage timings and counters of the live detection loop in this server process")
+
+if not metrics.enabled:
+    st.info("Instrumentation is off. Start the app with DETECTION_METRICS=1 to collect timings.")
+else:
+    show_diagnostics(st.empty())
+
+    # Export options
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.download_button(
+            label="Download Prometheus metrics",
+            data=metrics.to_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain",
+        )
+    with col2:
+        st.download_button(
+            label="Download JSON metrics",
+            data=metrics.to_json(),
+            file_name="metrics.json",
+            mime="application/json",
+        )
+    with col3:
+        if st.button("Reset metrics"):
+            metrics.reset()
+            st.rerun()
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def dhash(image, hash_size=8):
+    """Difference hash of a BGR/RGB/grayscale array or PIL image, as a `hash_size**2`-bit int.
+
+    The image is shrunk to (hash_size + 1) x hash_size grayscale pixels and
+    each bit says whether a pixel is brighter than its right neighbour, so
+    small noise, compression and exposure changes leave the hash (nearly)
+    unchanged.
+    """
+    if not isinstance(image, np.ndarray):
+        image = np.asarray(image.convert("L"))
+    # Subsample big frames with a stride first; averaging every pixel of a
+    # 640x480 frame down to 9x8 costs ~20x more and changes nothing at this size
+    step = max(1, min(image.shape[0] // (hash_size * 8), image.shape[1] // ((hash_size + 1) * 8)))
+    if step > 1:
+        image = image[::step, ::step]
+    if image.ndim == 3:
+        # Channel order doesn't matter much for a coarse brightness hash
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PredictionCache:
+    """Bounded LRU of predictions keyed by perceptual hash.
+
+    `get(key)` returns the cached value of the most recently used entry
+    within `max_distance` bits of `key` (an exact match is tried first),
+    or None. Entries older than `ttl` seconds are ignored and dropped, so
+    a slowly changing scene is re-checked now and then; `ttl=None` keeps
+    entries until they are evicted, which suits offline folders.
+    """
+
+    def __init__(self, max_entries=256, ttl=5.0, max_distance=4):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at, now):
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            match = key if key in self._entries else None
+            if match is None and self.max_distance > 0:
+                # Newest entries first: on a fixed camera the last frame is the likeliest match
+                for candidate in reversed(self._entries):
+                    if hamming(candidate, key) <= self.max_distance:
+                        match = candidate
+                        break
+
+            if match is not None:
+                value, stored_at = self._entries[match]
+                if not self._expired(stored_at, now):
+                    self._entries.move_to_end(match)
+                    self.hits += 1
+                    return value
+                del self._entries[match]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachedPredictor:
+    """Wraps a frame classifier so near-identical frames reuse the last prediction.
+
+    Works with anything that maps a frame to a result (`predict_frame`,
+    `frame_probabilities`, ...), so it is a drop-in like GatedPredictor.
+    """
+
+    def __init__(self, predict, cache=None):
+        self.predict = predict
+        self.cache = cache if cache is not None else PredictionCache()
+
+    def __call__(self, frame):
+        key = dhash(frame)
+        result = self.cache.get(key)
+        if result is None:
+            result = self.predict(frame)
+            self.cache.put(key, result)
+        return result
+
+    def stats(self):
+        return self.cache.stats()
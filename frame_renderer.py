@@ -0,0 +1,92 @@
+import time
+
+import cv2
+
+from metrics import Metrics
+
+
+class FrameRenderer:
+    """Sends camera frames to a Streamlit placeholder as small JPEGs.
+
+    Each new frame is downscaled to `width` pixels and JPEG-encoded once at
+    `quality`; the encoded bytes go to `placeholder.image()` as they are,
+    so Streamlit doesn't re-encode the full-size array. Frames are sent at
+    most `max_fps` times a second, whatever the capture or inference rate,
+    and a frame is skipped as unchanged unless `refresh_seconds` have
+    passed or some pixel of its grayscale thumbnail (`thumbnail_width`
+    wide) differs from the last frame sent by more than `pixel_threshold`
+    grey levels. Any local change counts, so a small animal moving across
+    a static scene still updates the feed.
+    """
+
+    def __init__(self, placeholder, width=480, quality=70, max_fps=10.0, refresh_seconds=2.0, pixel_threshold=8,
+                 thumbnail_width=160, metrics=None):
+        self.placeholder = placeholder
+        self.width = width
+        self.quality = quality
+        self.max_fps = max_fps
+        self.refresh_seconds = refresh_seconds
+        self.pixel_threshold = pixel_threshold
+        self.thumbnail_width = thumbnail_width
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+
+        self._last_id = None
+        self._last_thumbnail = None
+        self._last_sent = 0.0
+        self.frames_sent = 0
+        self.frames_unchanged = 0
+        self.bytes_sent = 0
+
+    def encode(self, frame):
+        """Downscale (never upscale) a BGR frame and JPEG-encode it."""
+        height, width = frame.shape[:2]
+        if self.width and width > self.width:
+            size = (self.width, round(height * self.width / width))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ok:
+            raise ValueError("Couldn't encode frame as JPEG")
+        return buffer.tobytes()
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.thumbnail_width, max(round(height * self.thumbnail_width / width), 1))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def _unchanged(self, thumbnail):
+        if self._last_thumbnail is None or thumbnail.shape != self._last_thumbnail.shape:
+            return False
+        return int(cv2.absdiff(thumbnail, self._last_thumbnail).max()) <= self.pixel_threshold
+
+    def render(self, frame_id, frame, now=None):
+        """Show `frame` if it is new, due and changed; returns whether it was sent."""
+        if frame is None or frame_id == self._last_id:
+            return False
+        now = time.time() if now is None else now
+        if self.max_fps and now - self._last_sent < 1.0 / self.max_fps:
+            return False
+        self._last_id = frame_id
+
+        thumbnail = self._thumbnail(frame)
+        if self._unchanged(thumbnail) and now - self._last_sent < self.refresh_seconds:
+            self.frames_unchanged += 1
+            self.metrics.increment("frames_render_unchanged")
+            return False
+
+        with self.metrics.stage("render"):
+            data = self.encode(frame)
+            self.placeholder.image(data)
+        self._last_thumbnail = thumbnail
+        self._last_sent = now
+        self.frames_sent += 1
+        self.bytes_sent += len(data)
+        self.metrics.increment("frames_rendered")
+        return True
+
+    def stats(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_unchanged": self.frames_unchanged,
+            "mean_kb": self.bytes_sent / self.frames_sent / 1024 if self.frames_sent else 0.0,
+        }
@@ -0,0 +1,333 @@
+"""Local HTTP inference service for other systems.
+
+Wraps the same model and rules as `modular.predict_image`, and coalesces
+concurrent requests into micro-batches so one model call serves many
+clients:
+
+    python inference_server.py --port 8502 --max-batch 16 --window-ms 10
+
+Endpoints (localhost only by default):
+
+    POST /predict                 encoded image (JPEG/PNG/...) as the request body
+    POST /predict/frame?width=640&height=480[&format=bgr|rgb]
+                                  raw uint8 frame buffer (height x width x 3)
+    GET  /health                  the process is up
+    GET  /ready                   the model is loaded and warmed up (503 until then)
+    GET  /queue                   queue depth and batching counters
+
+Predictions are returned as `{"class_name", "category", "confidence"}`,
+all null when nothing was detected (Human/Environment or under 90%).
+"""
+import argparse
+import io
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from PIL import Image
+
+from metrics import metrics
+from modular import INPUT_SIZE, predict_batch, preprocess_frame, preprocess_image, warm_up
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Request:
+    __slots__ = ("data", "done", "result", "error", "enqueued_at")
+
+    def __init__(self, data):
+        self.data = data
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """Collects preprocessed inputs from many threads and runs them in batches.
+
+    The worker waits for the first queued request, then keeps collecting
+    for at most `window_ms` (or until `max_batch` requests are waiting)
+    and runs them through a single model call. `window_ms=0` runs whatever
+    is queued right away. Callers block in `submit()` until their result
+    is ready; with more than `max_queue` waiting requests, `submit()`
+    raises QueueFull instead of queueing.
+    """
+
+    def __init__(self, max_batch=16, window_ms=10.0, max_queue=256):
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.max_queue = max_queue
+
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+        self._running = False
+        self._thread = None
+        self._buffer = np.empty((max_batch, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+
+        self.requests = 0
+        self.batches = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._arrived.notify_all()
+        if self._thread is not None:
+            self._thread.join(2.0)
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def submit(self, data, timeout=30.0):
+        """Queue one preprocessed (224, 224, 3) input and wait for its result triple."""
+        request = _Request(data)
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{len(self._queue)} requests already queued")
+            self._queue.append(request)
+            self._arrived.notify()
+        if not request.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for the model")
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take_batch(self):
+        with self._lock:
+            while self._running and not self._queue:
+                self._arrived.wait(0.5)
+            if not self._running:
+                return []
+            # Keep the batch open until it is full or the oldest request has waited `window`
+            deadline = self._queue[0].enqueued_at + self.window
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self._running:
+                    break
+                self._arrived.wait(remaining)
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        while self._running:
+            batch = self._take_batch()
+            if not batch:
+                continue
+            for i, request in enumerate(batch):
+                self._buffer[i] = request.data
+            try:
+                with metrics.stage("server_batch"):
+                    results = predict_batch(self._buffer[:len(batch)])
+            except Exception as e:
+                self.errors += 1
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+
+            self.requests += len(batch)
+            self.batches += 1
+            metrics.increment("server_requests", len(batch))
+            for request, result in zip(batch, results):
+                request.result = result
+                request.done.set()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_batch": self.max_batch,
+            "window_ms": self.window * 1000,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+def _decode_frame(body, query):
+    """Turn a raw uint8 frame buffer into a preprocessed input."""
+    try:
+        width, height = int(query["width"][0]), int(query["height"][0])
+    except (KeyError, ValueError):
+        raise ValueError("width and height query parameters are required")
+    if len(body) != width * height * 3:
+        raise ValueError(f"Expected {width * height * 3} bytes for a {width}x{height}x3 frame, got {len(body)}")
+    frame = np.frombuffer(body, dtype=np.uint8).reshape(height, width, 3)
+    frame_format = query.get("format", ["bgr"])[0].lower()
+    if frame_format == "bgr":
+        return preprocess_frame(frame, out=np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32))
+    if frame_format == "rgb":
+        return preprocess_image(frame)
+    raise ValueError(f"Unknown frame format: {frame_format}")
+
+
+def _content_length(headers):
+    value = headers.get("Content-Length") or "0"
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Invalid Content-Length header: {value!r}") from None
+
+
+def _decode_image(body):
+    try:
+        image = Image.open(io.BytesIO(body))
+        image.load()
+    except Exception as e:
+        raise ValueError(f"Couldn't decode image: {e}")
+    return preprocess_image(image)
+
+
+def _to_json(result):
+    class_name, category, confidence_score = result
+    return {
+        "class_name": class_name,
+        "category": category,
+        "confidence": float(confidence_score) if confidence_score is not None else None,
+    }
+
+
+class InferenceServer:
+    """ThreadingHTTPServer in front of a MicroBatcher.
+
+    Request threads decode and preprocess their own input in parallel;
+    only the model call is serialised through the batcher.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8502, max_batch=16, window_ms=10.0, max_queue=256,
+                 max_body_bytes=20 * 1024 * 1024):
+        self.batcher = MicroBatcher(max_batch, window_ms, max_queue)
+        self.max_body_bytes = max_body_bytes
+        self.ready = False
+        self.warm_up_error = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def _warm_up(self):
+        # Warm every batch size that can come up so no request pays for graph tracing
+        try:
+            warm_up(batch_sizes=range(1, self.batcher.max_batch + 1))
+        except Exception as e:
+            # /ready keeps answering 503, now with the reason
+            self.warm_up_error = e
+            return
+        self.ready = True
+
+    def start(self):
+        """Serve on a background thread; the model warms up in the background."""
+        self.batcher.start()
+        threading.Thread(target=self._warm_up, name="inference-warm-up", daemon=True).start()
+        threading.Thread(target=self.httpd.serve_forever, name="inference-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.batcher.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == "/health":
+                    self._send(200, {"status": "ok"})
+                elif path == "/ready":
+                    body = {"ready": server.ready}
+                    if server.warm_up_error is not None:
+                        body["error"] = str(server.warm_up_error)
+                    self._send(200 if server.ready else 503, body)
+                elif path == "/queue":
+                    self._send(200, server.batcher.stats())
+                else:
+                    self._send(404, {"error": "Not found"})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                try:
+                    length = _content_length(self.headers)
+                    if length <= 0 or length > server.max_body_bytes:
+                        self._send(413 if length > 0 else 400, {"error": "Missing or oversized request body"})
+                        return
+                    body = self.rfile.read(length)
+
+                    if url.path == "/predict":
+                        data = _decode_image(body)
+                    elif url.path == "/predict/frame":
+                        data = _decode_frame(body, parse_qs(url.query))
+                    else:
+                        self._send(404, {"error": "Not found"})
+                        return
+                    result = server.batcher.submit(data)
+                except ValueError as e:
+                    self._send(400, {"error": str(e)})
+                except QueueFull as e:
+                    self._send(503, {"error": f"Queue full: {e}"})
+                except TimeoutError as e:
+                    self._send(504, {"error": str(e)})
+                except Exception as e:
+                    self._send(500, {"error": str(e)})
+                else:
+                    self._send(200, _to_json(result))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve model predictions over local HTTP with micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8502, help="Port (default: 8502)")
+    parser.add_argument("--max-batch", type=int, default=16, help="Most requests per model call (default: 16)")
+    parser.add_argument("--window-ms", type=float, default=10.0,
+                        help="How long a batch waits to fill up, in ms (default: 10; 0 disables waiting)")
+    parser.add_argument("--max-queue", type=int, default=256, help="Queued requests before returning 503")
+    args = parser.parse_args(argv)
+
+    server = InferenceServer(args.host, args.port, args.max_batch, args.window_ms, args.max_queue).start()
+    print(f"Serving on http://{args.host}:{server.port} (max batch {args.max_batch}, window {args.window_ms} ms)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Load test for the local inference server.
+
+Sends JPEG-encoded synthetic frames (or your own image) from N concurrent
+clients and reports latency percentiles and throughput per concurrency
+level, plus the mean batch size the server formed:
+
+    # Against a running server
+    python load_test.py --url http://127.0.0.1:8502 --concurrency 1 4 16 --requests 200
+
+    # Or start an in-process server for each batching window and compare
+    python load_test.py --windows 0 5 10 25 --concurrency 1 8 32
+
+Comparing window 0 with larger windows shows how much throughput each
+millisecond of added latency buys.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from benchmark import synthetic_frames
+
+
+def _post(url, body, content_type):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return json.loads(response.read())
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def wait_until_ready(base_url, timeout=300.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if _get(f"{base_url}/ready")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{base_url} wasn't ready after {timeout:.0f}s")
+
+
+def run_level(base_url, payloads, concurrency, requests):
+    """Send `requests` requests from `concurrency` threads; returns latency/throughput stats."""
+    latencies = []
+    failures = []
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            body = payloads[i % len(payloads)]
+            start = time.perf_counter()
+            try:
+                _post(f"{base_url}/predict", body, "image/jpeg")
+            except (urllib.error.URLError, OSError) as e:
+                with lock:
+                    failures.append(str(e))
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    before = _get(f"{base_url}/queue")[1]
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - started
+    after = _get(f"{base_url}/queue")[1]
+
+    timings = np.array(latencies) if latencies else np.zeros(1)
+    batches = after["batches"] - before["batches"]
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "failures": len(failures),
+        "p50_ms": float(np.percentile(timings, 50) * 1000),
+        "p95_ms": float(np.percentile(timings, 95) * 1000),
+        "p99_ms": float(np.percentile(timings, 99) * 1000),
+        "throughput_per_s": len(latencies) / total if total else None,
+        "mean_batch_size": (after["requests"] - before["requests"]) / batches if batches else 0.0,
+        "window_ms": after["window_ms"],
+    }
+
+
+def _print_row(result):
+    print(f"window {result['window_ms']:6.1f} ms  clients {result['concurrency']:4d}  "
+          f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  p99 {result['p99_ms']:8.1f} ms  "
+          f"{result['throughput_per_s'] or 0:8.1f} req/s  batch {result['mean_batch_size']:5.1f}  "
+          f"failed {result['failures']}", file=sys.stderr)
+
+
+def load_payloads(image_path, count=16):
+    if image_path:
+        with open(image_path, "rb") as f:
+            return [f.read()]
+    import cv2
+
+    return [cv2.imencode(".jpg", frame)[1].tobytes() for frame in synthetic_frames(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure inference server throughput against added latency.")
+    parser.add_argument("--url", help="Base URL of a running server; without it, an in-process server is started")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 10],
+                        help="Batching windows (ms) to try with the in-process server (default: 0 10)")
+    parser.add_argument("--max-batch", type=int, default=16, help="Max batch of the in-process server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--image", help="Send this image instead of synthetic frames")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    payloads = load_payloads(args.image)
+    results = []
+
+    if args.url:
+        base_url = args.url.rstrip("/")
+        wait_until_ready(base_url)
+        for concurrency in args.concurrency:
+            results.append(run_level(base_url, payloads, concurrency, args.requests))
+            _print_row(results[-1])
+    else:
+        from inference_server import InferenceServer
+
+        for window_ms in args.windows:
+            server = InferenceServer(port=0, max_batch=args.max_batch, window_ms=window_ms).start()
+            base_url = f"http://127.0.0.1:{server.port}"
+            try:
+                wait_until_ready(base_url)
+                for concurrency in args.concurrency:
+                    results.append(run_level(base_url, payloads, concurrency, args.requests))
+                    _print_row(results[-1])
+            finally:
+                server.stop()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
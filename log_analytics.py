@@ -0,0 +1,13 @@
+import pandas as pd
+
+LOG_COLUMNS = ['timestamp', 'class_name', 'category', 'confidence_score']
+
+
+def entries_to_frame(entries):
+    """Build a typed DataFrame from store entries."""
+    df = pd.DataFrame(entries, columns=LOG_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df['confidence_score'] = df['confidence_score'].astype(float)
+    df['date'] = df['timestamp'].dt.date
+    return df
+
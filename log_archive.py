@@ -0,0 +1,227 @@
+import json
+import os
+from datetime import date
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # The archive is optional; without it the dashboard only lists the index's raw rows
+    pa = None
+
+from detection_store import get_store
+from log_analytics import entries_to_frame
+
+# Date-partitioned Parquet archive of the detection log
+ARCHIVE_DIR = "logs/archive"
+CHECKPOINT_FILE = "_checkpoint.json"
+
+ARCHIVE_AVAILABLE = pa is not None
+
+if ARCHIVE_AVAILABLE:
+    ARCHIVE_SCHEMA = pa.schema([
+        ("timestamp", pa.timestamp("s")),
+        ("class_name", pa.dictionary(pa.int16(), pa.string())),
+        ("category", pa.dictionary(pa.int8(), pa.string())),
+        ("confidence_score", pa.float32()),
+    ])
+    PLAIN_SCHEMA = pa.schema([
+        ("timestamp", pa.timestamp("s")),
+        ("class_name", pa.string()),
+        ("category", pa.string()),
+        ("confidence_score", pa.float32()),
+    ])
+    PARTITIONING = ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive")
+
+
+def _partition_dir(archive_dir, day):
+    return os.path.join(archive_dir, f"date={day.isoformat()}")
+
+
+def _read_json(path, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_atomic(path, write):
+    # Dot-prefixed so dataset discovery never picks up a half-written file
+    directory, name = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def read_checkpoint(archive_dir=ARCHIVE_DIR):
+    """Return the store offset up to which the log has been archived."""
+    return _read_json(os.path.join(archive_dir, CHECKPOINT_FILE), {"offset": 0})["offset"]
+
+
+def _table_to_frame(table):
+    """Decode an archive table into a frame with typed timestamps and a `date` column."""
+    df = table.cast(PLAIN_SCHEMA).to_pandas()
+    df["confidence_score"] = df["confidence_score"].astype(float)
+    df["date"] = df["timestamp"].dt.date
+    return df
+
+
+def _to_table(df):
+    return pa.Table.from_pandas(
+        df[["timestamp", "class_name", "category", "confidence_score"]],
+        schema=ARCHIVE_SCHEMA,
+        preserve_index=False
+    )
+
+
+def _compact_partition(directory, new_table):
+    """Merge `new_table` and any existing part files of one day into a single file."""
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, "part-0.parquet")
+    tables = [pq.read_table(target, schema=ARCHIVE_SCHEMA)] if os.path.exists(target) else []
+    tables.append(new_table)
+    merged = pa.concat_tables(tables).sort_by("timestamp")
+    write_atomic(target, lambda path: pq.write_table(merged, path, compression="zstd"))
+
+
+def compact(store=None, archive_dir=ARCHIVE_DIR):
+    """Roll records appended since the last run into the date-partitioned archive.
+
+    Each day lives in `date=YYYY-MM-DD/part-0.parquet` with a typed
+    timestamp, dictionary-encoded species/category and float32 confidence.
+    `_checkpoint.json` stores the store offset so the next run only reads
+    newer records. Returns the number of archived records.
+    """
+    if not ARCHIVE_AVAILABLE:
+        raise RuntimeError("pyarrow is required for the detection archive")
+
+    store = store or get_store()
+    os.makedirs(archive_dir, exist_ok=True)
+    checkpoint = read_checkpoint(archive_dir)
+
+    entries, offset = store.read_since(checkpoint)
+    if offset < checkpoint:
+        # The store was rotated or recreated: everything in it is new
+        entries, offset = store.read_since(0)
+    if not entries:
+        return 0
+
+    df = entries_to_frame(entries)
+    for day, day_df in df.groupby("date"):
+        _compact_partition(_partition_dir(archive_dir, day), _to_table(day_df))
+
+    write_atomic(os.path.join(archive_dir, CHECKPOINT_FILE), lambda path: _write_json(path, {"offset": offset}))
+    return len(entries)
+
+
+def has_archive(archive_dir=ARCHIVE_DIR):
+    return ARCHIVE_AVAILABLE and os.path.exists(os.path.join(archive_dir, CHECKPOINT_FILE))
+
+
+def _dataset(archive_dir):
+    return ds.dataset(
+        archive_dir,
+        format="parquet",
+        partitioning=PARTITIONING,
+        schema=ARCHIVE_SCHEMA.append(pa.field("date", pa.date32())),
+        ignore_prefixes=["_", "."]
+    )
+
+
+def _filter_expression(start_date=None, end_date=None, category=None, min_confidence=None, before=None):
+    """Build a pyarrow filter; the date conditions prune whole partitions."""
+    expression = None
+    conditions = []
+    if start_date is not None:
+        conditions.append(ds.field("date") >= start_date)
+    if end_date is not None:
+        conditions.append(ds.field("date") <= end_date)
+    if before is not None:
+        conditions.append(ds.field("date") <= before.date())
+        conditions.append(ds.field("timestamp") < pa.scalar(before, pa.timestamp("s")))
+    if category is not None:
+        conditions.append(ds.field("category") == category)
+    if min_confidence is not None:
+        conditions.append(pc.multiply(ds.field("confidence_score"), 100) >= min_confidence)
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _days(archive_dir):
+    """Archived days, newest first."""
+    return sorted(
+        (date.fromisoformat(name[len("date="):]) for name in os.listdir(archive_dir) if name.startswith("date=")),
+        reverse=True
+    )
+
+
+def count_rows(start_date=None, end_date=None, category=None, min_confidence=None, before=None,
+               archive_dir=ARCHIVE_DIR):
+    """Count archived rows matching the filters (and older than `before`, a datetime)."""
+    return _dataset(archive_dir).count_rows(
+        filter=_filter_expression(start_date, end_date, category, min_confidence, before)
+    )
+
+
+def read_rows(start_date=None, end_date=None, category=None, min_confidence=None, before=None,
+              limit=None, offset=0, archive_dir=ARCHIVE_DIR):
+    """Read archived rows matching the filters, newest first, pruning partitions by date.
+
+    With `limit`, only the days needed for rows `offset` to `offset + limit`
+    are read, newest day first, so a page near the start stays cheap.
+    """
+    dataset = _dataset(archive_dir)
+    expression = _filter_expression(start_date, end_date, category, min_confidence, before)
+    columns = ["timestamp", "class_name", "category", "confidence_score"]
+    if limit is None:
+        table = dataset.to_table(columns=columns, filter=expression)
+        return _table_to_frame(table.sort_by([("timestamp", "descending")]))
+
+    tables = []
+    for day in _days(archive_dir):
+        if limit <= 0:
+            break
+        if (start_date is not None and day < start_date) or (end_date is not None and day > end_date):
+            continue
+        day_filter = ds.field("date") == day
+        table = dataset.to_table(
+            columns=columns,
+            filter=day_filter if expression is None else expression & day_filter
+        ).sort_by([("timestamp", "descending")])
+        if offset >= table.num_rows:
+            offset -= table.num_rows
+            continue
+        table = table.slice(offset, limit)
+        offset = 0
+        limit -= table.num_rows
+        tables.append(table)
+    if not tables:
+        return _table_to_frame(PLAIN_SCHEMA.empty_table())
+    return _table_to_frame(pa.concat_tables(tables))
+
+
+def export_csv(sink, start_date=None, end_date=None, category=None, min_confidence=None, before=None,
+               archive_dir=ARCHIVE_DIR):
+    """Stream archived rows matching the filters to `sink` (path or binary file) as CSV, oldest first, batch by batch."""
+    scanner = _dataset(archive_dir).scanner(
+        columns=["timestamp", "class_name", "category", "confidence_score"],
+        filter=_filter_expression(start_date, end_date, category, min_confidence, before)
+    )
+    with pa_csv.CSVWriter(sink, PLAIN_SCHEMA) as writer:
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                writer.write_table(pa.Table.from_batches([batch]).cast(PLAIN_SCHEMA))
+
+
+if __name__ == "__main__":
+    count = compact()
+    print(f"Archived {count} detections into {ARCHIVE_DIR} (checkpoint offset {read_checkpoint()})")
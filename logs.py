@@ -1,165 +1,186 @@
 import streamlit as st
+import io
+import math
+from datetime import datetime
+
 import pandas as pd
-import json
-import os
-import plotly.express as px
-from datetime import datetime, timedelta
+
+import log_archive
+from detection_index import get_index
+from retention import run_retention_if_due
 
 # Title and description
 st.title("Endangered Animal Detection Logs")
 st.write("View and analyze the history of animal detections")
 
-# Path to log file
-LOG_FILE = "logs/detection_logs.json"
+# Indexed query layer over the detection store, shared by every session and rerun
+index = get_index()
+
+# Index only the records appended since the last rerun (and fold old raw detections into daily summaries once a day)
+try:
+    run_retention_if_due(index.store)
+    index.refresh()
+except Exception as e:
+    st.error(f"Error loading detection logs: {e}")
 
-# Check if log file exists
-if not os.path.exists(LOG_FILE):
-    st.error("No detection logs found. Start detecting animals first.")
-    logs = []
+first_day, last_day = index.date_bounds()
+
+if first_day is None:
+    st.warning("No detections recorded yet.")
 else:
-    # Load logs with error handling
-    try:
-        with open(LOG_FILE, "r") as f:
-            file_content = f.read().strip()
-            # Check if file is empty or contains only whitespace
-            if not file_content:
-                logs = []
-                # Initialize the file with an empty array
-                with open(LOG_FILE, "w") as f:
-                    json.dump([], f)
-            else:
-                logs = json.loads(file_content)
-    except json.JSONDecodeError:
-        st.error("Log file is corrupted. Resetting log file.")
-        logs = []
-        # Reset the log file with an empty array
-        with open(LOG_FILE, "w") as f:
-            json.dump([], f)
-
-    if not logs:
-        st.warning("No detections recorded yet.")
+    # Sidebar filters
+    st.sidebar.header("Filters")
+
+    # Date range filter
+    date_range = st.sidebar.date_input(
+        "Select Date Range",
+        value=(first_day, last_day),
+        min_value=first_day,
+        max_value=last_day
+    )
+
+    if len(date_range) == 2:
+        start_date, end_date = date_range
     else:
-        # Convert to DataFrame for easier manipulation
-        df = pd.DataFrame(logs)
-
-        # Convert timestamp strings to datetime objects
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-
-        # Sort by timestamp (newest first)
-        df = df.sort_values('timestamp', ascending=False)
-
-        # Add a date column for filtering
-        df['date'] = df['timestamp'].dt.date
-
-        # Sidebar filters
-        st.sidebar.header("Filters")
-
-        # Date range filter
-        date_range = st.sidebar.date_input(
-            "Select Date Range",
-            value=(
-                df['date'].min(),
-                df['date'].max()
-            ),
-            min_value=df['date'].min(),
-            max_value=df['date'].max()
-        )
-
-        if len(date_range) == 2:
-            start_date, end_date = date_range
-            mask = (df['date'] >= start_date) & (df['date'] <= end_date)
-            filtered_df = df.loc[mask]
+        start_date, end_date = None, None
+
+    # Category filter
+    categories = ['All'] + index.categories()
+    selected_category = st.sidebar.selectbox("Select Category", categories)
+    category = selected_category if selected_category != 'All' else None
+
+    # Confidence score filter
+    min_confidence = st.sidebar.slider(
+        "Minimum Confidence Score (%)",
+        min_value=90,
+        max_value=100,
+        value=90,
+        step=1
+    )
+
+    # Every query below is answered by the index; only aggregates and one table page are loaded
+    filters = dict(start_date=start_date, end_date=end_date, category=category, min_confidence=min_confidence)
+    total_detections, unique_species, avg_confidence = index.summary(**filters)
+
+    # Display summary metrics
+    st.header("Summary")
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Total Detections", total_detections)
+
+    with col2:
+        st.metric("Unique Species", unique_species)
+
+    with col3:
+        if avg_confidence is not None:
+            st.metric("Avg. Confidence Score", f"{avg_confidence:.2f}%")
         else:
-            filtered_df = df
-
-        # Category filter
-        categories = ['All'] + sorted(df['category'].unique().tolist())
-        selected_category = st.sidebar.selectbox("Select Category", categories)
-
-        if selected_category != 'All':
-            filtered_df = filtered_df[filtered_df['category'] == selected_category]
-
-        # Confidence score filter
-        min_confidence = st.sidebar.slider(
-            "Minimum Confidence Score (%)",
-            min_value=90,
-            max_value=100,
-            value=90,
-            step=1
-        )
-
-        filtered_df = filtered_df[filtered_df['confidence_score'] * 100 >= min_confidence]
-
-        # Display summary metrics
-        st.header("Summary")
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            st.metric("Total Detections", len(filtered_df))
-
-        with col2:
-            if not filtered_df.empty:
-                st.metric("Unique Species", filtered_df['class_name'].nunique())
-            else:
-                st.metric("Unique Species", 0)
-
-        with col3:
-            if not filtered_df.empty:
-                avg_confidence = (filtered_df['confidence_score'] * 100).mean()
-                st.metric("Avg. Confidence Score", f"{avg_confidence:.2f}%")
-            else:
-                st.metric("Avg. Confidence Score", "N/A")
-
-        # Visualizations
-        if not filtered_df.empty:
-            st.header("Visualizations")
-
-            tab1, tab2 = st.tabs(["Detection Trends", "Category Distribution"])
-
-            with tab1:
-                # Group by date and count detections
-                daily_counts = filtered_df.groupby(filtered_df['timestamp'].dt.date).size().reset_index(name='count')
-                daily_counts.columns = ['date', 'count']
-
-                # Create the time trend chart
-                fig = px.line(
-                    daily_counts,
-                    x='date',
-                    y='count',
-                    title='Daily Detection Count',
-                    labels={'date': 'Date', 'count': 'Number of Detections'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-            with tab2:
-                # Create a pie chart of categories
-                category_counts = filtered_df['category'].value_counts().reset_index()
-                category_counts.columns = ['category', 'count']
-
-                fig = px.pie(
-                    category_counts,
-                    values='count',
-                    names='category',
-                    title='Detection Categories'
-                )
-                st.plotly_chart(fig, use_container_width=True)
-
-        # Display the data table
-        st.header("Detection Log")
-
-        # Format the dataframe for display
-        display_df = filtered_df.copy()
-        display_df['confidence_score'] = (display_df['confidence_score'] * 100).round(2).astype(str) + '%'
-        display_df = display_df[['timestamp', 'class_name', 'category', 'confidence_score']]
-        display_df.columns = ['Timestamp', 'Species', 'Category', 'Confidence Score']
-
-        st.dataframe(display_df, use_container_width=True)
-
-        # Download option
-        csv = display_df.to_csv(index=False)
+            st.metric("Avg. Confidence Score", "N/A")
+
+    # Visualizations
+    if total_detections:
+        st.header("Visualizations")
+
+        # plotly is only imported when there is something to chart
+        import plotly.express as px
+
+        tab1, tab2, tab3, tab4 = st.tabs(["Detection Trends", "Category Distribution", "Species", "Confidence"])
+
+        with tab1:
+            # Detections per day or per hour
+            bucket = st.radio("Bucket", ["day", "hour"], horizontal=True, format_func=str.capitalize)
+            trend = index.counts(bucket, **filters)
+
+            # Create the time trend chart
+            fig = px.line(
+                trend,
+                x=bucket,
+                y='count',
+                title='Daily Detection Count' if bucket == 'day' else 'Hourly Detection Count',
+                labels={bucket: 'Date' if bucket == 'day' else 'Hour', 'count': 'Number of Detections'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        with tab2:
+            # Create a pie chart of categories
+            fig = px.pie(
+                index.counts("category", **filters),
+                values='count',
+                names='category',
+                title='Detection Categories'
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        with tab3:
+            fig = px.bar(
+                index.counts("species", **filters),
+                x='species',
+                y='count',
+                title='Detections per Species',
+                labels={'species': 'Species', 'count': 'Number of Detections'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        with tab4:
+            fig = px.bar(
+                index.confidence_histogram(**filters),
+                x='confidence',
+                y='count',
+                title='Confidence Score Distribution',
+                labels={'confidence': 'Confidence Score (%)', 'count': 'Number of Detections'}
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    # Display the data table, one page at a time (newest first)
+    st.header("Detection Log")
+
+    # The index lists raw rows; detections retention folded away are read back from the Parquet
+    # archive (older than the index's oldest row, with the filters pushed down to the files)
+    row_count = index.row_count(**filters)
+    archived_count = 0
+    if total_detections > row_count and log_archive.has_archive():
+        first_timestamp = index.first_timestamp()
+        archive_filters = dict(filters, before=datetime.fromisoformat(first_timestamp) if first_timestamp else None)
+        archived_count = log_archive.count_rows(**archive_filters)
+    summarized = total_detections - row_count - archived_count
+    if archived_count:
+        st.caption(f"{archived_count} older detections are listed from the Parquet archive")
+    if summarized > 0:
+        st.caption(f"{row_count + archived_count} detections listed; {summarized} older detections are only kept "
+                   f"as daily summaries (counted in the totals and charts above)")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        page_size = st.selectbox("Rows per page", [50, 100, 250, 1000], index=1)
+    pages = max(math.ceil((row_count + archived_count) / page_size), 1)
+    with col2:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+
+    offset = (page - 1) * page_size
+    display_df = index.rows(limit=page_size, offset=offset, **filters)
+    if archived_count and len(display_df) < page_size:
+        # The page runs past the newest archived-only row: continue in the archive
+        archived_df = log_archive.read_rows(limit=page_size - len(display_df), offset=max(offset - row_count, 0),
+                                            **archive_filters)
+        archived_df['timestamp'] = archived_df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        display_df = pd.concat([display_df, archived_df[display_df.columns]], ignore_index=True)
+    display_df['confidence_score'] = (display_df['confidence_score'] * 100).round(2).astype(str) + '%'
+    display_df.columns = ['Timestamp', 'Species', 'Category', 'Confidence Score']
+
+    st.dataframe(display_df, use_container_width=True)
+
+    # Download option: built in memory only on request (Streamlit serves downloads from memory).
+    # Archived-only rows are streamed batch by batch from the Parquet files, then the index rows in chunks.
+    if st.button("Prepare CSV download"):
+        archived = io.BytesIO()
+        if archived_count:
+            log_archive.export_csv(archived, **archive_filters)
+        buffer = io.StringIO()
+        index.export_csv(buffer, header=not archived_count, **filters)
         st.download_button(
             label="Download Detection Log CSV",
-            data=csv,
+            data=archived.getvalue() + buffer.getvalue().encode("utf-8"),
             file_name="animal_detection_log.csv",
             mime="text/csv",
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Turn instrumentation on with DETECTION_METRICS=1; when off, every call is a no-op
+METRICS_ENABLED = os.environ.get("DETECTION_METRICS", "0").lower() in ("1", "true", "yes")
+
+# Where `export` writes by default
+METRICS_FILE = "logs/metrics.prom"
+
+# Optional local HTTP endpoint for scraping (e.g. DETECTION_METRICS_PORT=9108)
+METRICS_PORT = os.environ.get("DETECTION_METRICS_PORT")
+
+# Latency buckets (seconds) used for the Prometheus histogram output
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+_NULL_STAGE = nullcontext()
+
+
+class _Histogram:
+    """Rolling window of recent samples plus cumulative bucket counts."""
+
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.recent.append(value)
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        else:
+            self.bucket_counts[-1] += 1
+
+    def summary(self):
+        if not self.recent:
+            return {"count": self.count, "sum": self.total}
+        recent = np.fromiter(self.recent, dtype=float)
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "p50_ms": float(p50 * 1000),
+            "p95_ms": float(p95 * 1000),
+            "p99_ms": float(p99 * 1000),
+            "max_ms": float(recent.max() * 1000),
+        }
+
+
+class Metrics:
+    """Per-stage timings and counters for the live detection loop.
+
+    Stages are timed with `with metrics.stage("predict"):` and counters are
+    bumped with `metrics.increment("frames_read")`. Each stage keeps a
+    rolling window of recent latencies for percentiles and cumulative
+    buckets for Prometheus. A disabled instance returns immediately.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, window=500):
+        self.enabled = enabled
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def stage(self, name):
+        """Context manager timing one stage; a shared no-op when disabled."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(self.window)
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        """Return counters and stage latency summaries as a plain dict."""
+        with self._lock:
+            return {
+                "uptime_s": time.time() - self.started,
+                "counters": dict(self._counters),
+                "stages": {name: h.summary() for name, h in self._histograms.items()},
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=4)
+
+    def to_prometheus(self, prefix="detection"):
+        """Render counters and stage histograms in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+
+            metric = f"{prefix}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=METRICS_FILE):
+        """Write the metrics to `path` (.json for JSON, anything else for Prometheus text)."""
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+
+def serve(metrics, port, host="127.0.0.1"):
+    """Serve `/metrics` (Prometheus text) and `/metrics.json` on a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = metrics.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+
+# Process-wide metrics shared by every session
+metrics = Metrics()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server():
+    """Start the /metrics endpoint once per process if enabled and a port is configured."""
+    global _server
+    if not metrics.enabled or not METRICS_PORT:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = serve(metrics, int(METRICS_PORT))
+        return _server
+
+
+def stage_rows(snapshot):
+    """Flatten a snapshot's stages into table rows, slowest p95 first."""
+    rows = [
+        {"stage": name, **{key: round(value, 3) for key, value in summary.items()}}
+        for name, summary in snapshot["stages"].items()
+    ]
+    return sorted(rows, key=lambda row: row.get("p95_ms", 0), reverse=True)
+
+
+def show_diagnostics(placeholder, source=None):
+    """Render stage timings and counters into a Streamlit placeholder."""
+    snapshot = (source or metrics).snapshot()
+    container = placeholder.container()
+    container.caption(f"Uptime {snapshot['uptime_s']:.0f}s · rolling window of the last "
+                      f"{(source or metrics).window} samples per stage")
+    rows = stage_rows(snapshot)
+    if rows:
+        container.dataframe(rows, use_container_width=True)
+    if snapshot["counters"]:
+        columns = container.columns(len(snapshot["counters"]))
+        for column, (name, value) in zip(columns, sorted(snapshot["counters"].items())):
+            column.metric(name.replace("_", " ").capitalize(), value)
@@ -1,10 +1,191 @@
-from keras.models import load_model
 from PIL import Image, ImageOps
+import cv2
 import numpy as np
+import itertools
+import os
 import re  # Sayıları temizlemek için regex kullanacağız
+import threading
+import time
+from metrics import metrics
 
-# Modeli yükle
-model = load_model("keras_model.h5", compile=False)
+# Model dosyası ve çıkarım arka ucu (keras, tflite, tflite-int8, onnx, onnx-int8)
+MODEL_PATH = "keras_model.h5"
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras")
+
+# Dönüştürülmüş model dosyaları; ilk kullanımda bir kez üretilir
+BACKEND_ARTIFACTS = {
+    "tflite": "keras_model.tflite",
+    "tflite-int8": "keras_model_int8.tflite",
+    "onnx": "keras_model.onnx",
+    "onnx-int8": "keras_model_int8.onnx",
+}
+
+
+class KerasBackend:
+    """keras_model.h5 dosyasını TensorFlow/Keras ile çalıştırır."""
+
+    name = "keras"
+
+    def __init__(self, model_path=MODEL_PATH):
+        from keras.models import load_model
+
+        self.model = load_model(model_path, compile=False)
+
+    def predict(self, data):
+        return self.model.predict(data, batch_size=len(data), verbose=0)
+
+
+class TFLiteBackend:
+    """Dönüştürülmüş .tflite modelini hafif TFLite yorumlayıcısıyla çalıştırır."""
+
+    name = "tflite"
+
+    def __init__(self, model_path):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input_detail["shape"][0])
+        self._lock = threading.Lock()
+
+    def predict(self, data):
+        # Yorumlayıcı iş parçacığı güvenli değil; model tüm oturumlarca paylaşıldığı için çağrılar sıraya girer
+        with self._lock:
+            # Yorumlayıcı sabit parti boyutuyla çalışır; gerekirse yeniden boyutlandır
+            if len(data) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_detail["index"], data.shape)
+                self.interpreter.allocate_tensors()
+                self.input_detail = self.interpreter.get_input_details()[0]
+                self.output_detail = self.interpreter.get_output_details()[0]
+                self.batch_size = len(data)
+
+            if self.input_detail["dtype"] != np.float32:
+                scale, zero_point = self.input_detail["quantization"]
+                info = np.iinfo(self.input_detail["dtype"])
+                # Kalibre edilen aralığın dışındaki değerler taşıp ters işarete dönmesin
+                data = np.clip(np.round(data / scale + zero_point), info.min, info.max).astype(self.input_detail["dtype"])
+
+            self.interpreter.set_tensor(self.input_detail["index"], data)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output_detail["index"])
+
+        if self.output_detail["dtype"] != np.float32:
+            scale, zero_point = self.output_detail["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class ONNXBackend:
+    """Dönüştürülmüş .onnx modelini ONNX Runtime ile CPU üzerinde çalıştırır."""
+
+    name = "onnx"
+
+    def __init__(self, model_path):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, data):
+        return self.session.run(None, {self.input_name: data})[0]
+
+
+def _representative_data(sample_images, limit=100):
+    """int8 kalibrasyonu için örnek görüntülerden tek tek giriş tensörleri üretir."""
+    data = np.empty((1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    for image in itertools.islice(sample_images, limit):
+        _preprocess_into(image, data[0])
+        yield [data.copy()]
+
+
+def convert_model(backend, sample_images=None, model_path=MODEL_PATH, output_path=None):
+    """keras_model.h5 dosyasını verilen arka uç için bir kez dönüştürüp diske yazar.
+
+    `backend` BACKEND_ARTIFACTS anahtarlarından biridir. int8 varyantları için
+    `sample_images` (PIL görüntüleri veya RGB kareler) kalibrasyonda kullanılır.
+    Yazılan dosyanın yolunu döndürür.
+    """
+    if backend not in BACKEND_ARTIFACTS:
+        raise ValueError(f"Unknown backend: {backend}")
+    if backend == "tflite-int8" and not sample_images:
+        # Rastgele gürültüyle kalibrasyon sessizce doğruluk kaybettirir
+        raise ValueError("tflite-int8 needs sample images for calibration")
+
+    output_path = output_path or BACKEND_ARTIFACTS[backend]
+    keras_model = KerasBackend(model_path).model
+
+    if backend.startswith("tflite"):
+        import tensorflow as tf
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+        if backend == "tflite-int8":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = lambda: _representative_data(sample_images)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+        with open(output_path, "wb") as f:
+            f.write(converter.convert())
+    else:
+        import tensorflow as tf
+        import tf2onnx
+
+        spec = (tf.TensorSpec((None, INPUT_SIZE[1], INPUT_SIZE[0], 3), tf.float32, name="input"),)
+        float_path = BACKEND_ARTIFACTS["onnx"] if backend == "onnx-int8" else output_path
+        tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=13, output_path=float_path)
+        if backend == "onnx-int8":
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+
+    return output_path
+
+
+def load_backend(backend=MODEL_BACKEND, model_path=MODEL_PATH):
+    """İstenen çıkarım arka ucunu yükler; dönüştürülmüş dosya yoksa önce onu üretir."""
+    if backend == "keras":
+        return KerasBackend(model_path)
+    if backend not in BACKEND_ARTIFACTS:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    artifact = BACKEND_ARTIFACTS[backend]
+    if not os.path.exists(artifact):
+        if backend.endswith("-int8"):
+            # int8 modeller gerçek örneklerle dönüştürülüp doğruluğu kontrol edilmeden kullanılmaz
+            raise RuntimeError(
+                f"{artifact} not found. Convert it with real sample images first: "
+                f"python modular.py {backend} --samples path/to/sample_images"
+            )
+        convert_model(backend, model_path=model_path, output_path=artifact)
+
+    if backend.startswith("tflite"):
+        return TFLiteBackend(artifact)
+    return ONNXBackend(artifact)
+
+
+# Model ve etiketler ilk kullanımda bir kez yüklenir ve süreçteki tüm oturumlarca paylaşılır
+_model = None
+_class_names = None
+_model_lock = threading.Lock()
+_labels_lock = threading.Lock()
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+_warm_up_error = None
+
+
+def get_model():
+    """Paylaşılan modeli döndürür; ilk çağrıda MODEL_BACKEND arka ucunu yükler."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_backend()
+    return _model
 
 
 # **labels.txt içinden boşlukları ve başındaki sayıları temizle**
@@ -15,8 +196,24 @@ def clean_label(line):
     return line
 
 
-with open("labels.txt", "r", encoding="utf-8") as f:
-    class_names = [clean_label(line) for line in f.readlines() if line.strip()]  # Boş satırları temizle
+def get_class_names():
+    """labels.txt içindeki sınıf adlarını döndürür (bir kez okunur)."""
+    global _class_names
+    if _class_names is None:
+        with _labels_lock:
+            if _class_names is None:
+                with open("labels.txt", "r", encoding="utf-8") as f:
+                    _class_names = [clean_label(line) for line in f.readlines() if line.strip()]  # Boş satırları temizle
+    return _class_names
+
+
+def __getattr__(name):
+    # Eski `modular.model` / `modular.class_names` kullanımları için tembel erişim
+    if name == "model":
+        return get_model()
+    if name == "class_names":
+        return get_class_names()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Nesli tükenmekte olan hayvanları sınıflarına göre gruplama
 animal_classes = {
@@ -31,32 +228,116 @@ animal_classes = {
 }
 
 
+# Hayvan adından sınıfa hızlı erişim için önceden hesaplanmış sözlük
+_animal_class_index = {}
+for _category, _animals in animal_classes.items():
+    for _animal in _animals:
+        _animal_class_index.setdefault(_animal, _category)
+
+
 def get_animal_class(animal_name):
     """Hayvanın nesli tükenme sınıfını döndürür."""
-    for category, animals in animal_classes.items():
-        if animal_name in animals:
-            return category
-    return "Unknown"
+    return _animal_class_index.get(animal_name, "Unknown")
 
 
-def predict_image(image):
-    """Verilen görüntü için model tahmini döndürür."""
-    size = (224, 224)
-    image = ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+# Modelin beklediği giriş boyutu
+INPUT_SIZE = (224, 224)
+
+
+def _preprocess_into(image, out):
+    """PIL görüntüsünü veya RGB numpy karesini normalize edip verilen tampona yazar."""
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image = ImageOps.fit(image, INPUT_SIZE, Image.Resampling.LANCZOS)
 
     image_array = np.asarray(image)
-    normalized_image_array = (image_array.astype(np.float32) / 127.5) - 1
+    out[...] = (image_array.astype(np.float32) / 127.5) - 1
 
-    data = np.ndarray(shape=(1, 224, 224, 3), dtype=np.float32)
-    data[0] = normalized_image_array
 
-    prediction = model.predict(data)
-    probabilities = prediction[0] / np.sum(prediction[0])
+# Kamera kareleri için iş parçacığı başına yeniden kullanılan tamponlar
+_frame_buffers = threading.local()
+
+
+def _center_crop_box(width, height):
+    """ImageOps.fit ile aynı merkez kırpma kutusunu (x, y, genişlik, yükseklik) döndürür."""
+    output_ratio = INPUT_SIZE[0] / INPUT_SIZE[1]
+    if width / height >= output_ratio:
+        crop_width, crop_height = round(height * output_ratio), height
+    else:
+        crop_width, crop_height = width, round(width / output_ratio)
+    return (width - crop_width) // 2, (height - crop_height) // 2, crop_width, crop_height
+
+
+def preprocess_frame(frame, out=None):
+    """Ham BGR kamera karesini PIL'e çevirmeden modele hazırlar.
+
+    Merkez kırpma bir dilimdir (kopya yok), boyutlandırma tek bir cv2.resize
+    çağrısıdır (küçültürken INTER_AREA, 224 pikselden küçük kareleri
+    büyütürken PIL'in LANCZOS'una en yakın INTER_LANCZOS4); kanal çevirme ve
+    normalizasyon küçük kare üzerinde, önceden ayrılmış tamponlara yapılır.
+    Sonuç `out` tamponuna (224, 224, 3) float32 olarak yazılır; `out`
+    verilmezse iş parçacığına ait yeniden kullanılan tampon döner.
+    """
+    data, resized, rgb = _get_frame_buffers()
+    if out is None:
+        out = data[0]
+
+    x, y, crop_width, crop_height = _center_crop_box(frame.shape[1], frame.shape[0])
+    # INTER_AREA büyütmede bulanık ve bloklu kalır, PIL yolundan çok uzaklaşır
+    interpolation = cv2.INTER_AREA if crop_width >= INPUT_SIZE[0] else cv2.INTER_LANCZOS4
+    cv2.resize(frame[y:y + crop_height, x:x + crop_width], INPUT_SIZE, dst=resized, interpolation=interpolation)
+
+    # BGR -> RGB (küçük karede) ve [-1, 1] aralığına normalizasyon, doğrudan giriş tamponuna
+    cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=rgb)
+    np.multiply(rgb, 1 / 127.5, out=out, casting="unsafe")
+    out -= 1
+    return out
+
+
+def _get_frame_buffers():
+    buffers = getattr(_frame_buffers, "buffers", None)
+    if buffers is None:
+        buffers = (
+            np.empty((1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32),
+            np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8),
+            np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8),
+        )
+        _frame_buffers.buffers = buffers
+    return buffers
+
+
+def preprocess_parity(frames):
+    """BGR kareler için cv2 yolu ile PIL yolu arasındaki farkı ölçer.
+
+    Normalize edilmiş [-1, 1] değerler üzerinden en büyük ve ortalama mutlak
+    farkı döndürür; yeni yolun eski `predict_image` girişine yeterince yakın
+    kaldığını doğrulamak için kullanılır.
+    """
+    reference = np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    candidate = np.empty_like(reference)
+    max_diff = mean_diff = 0.0
+    count = 0
+    for frame in frames:
+        _preprocess_into(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), reference)
+        preprocess_frame(frame, out=candidate)
+        diff = np.abs(reference - candidate)
+        max_diff = max(max_diff, float(diff.max()))
+        mean_diff += float(diff.mean())
+        count += 1
+    return {"frames": count, "max_abs_diff": max_diff, "mean_abs_diff": mean_diff / count if count else 0.0}
+
+
+def interpret_prediction(prediction):
+    """Tek bir model çıktısını (class_name, animal_class, confidence) üçlüsüne çevirir."""
+    probabilities = prediction / np.sum(prediction)
 
     index = np.argmax(probabilities)
     confidence_score = probabilities[index]
 
     # **labels.txt içinden doğru etiketi al**
+    class_names = get_class_names()
     if index < len(class_names):
         class_name = class_names[index].strip()
     else:
@@ -73,4 +354,313 @@ def predict_image(image):
     # Hayvanın nesli tükenme sınıfını al
     animal_class = get_animal_class(class_name)
 
-    return class_name, animal_class, confidence_score
\ No newline at end of file
+    return class_name, animal_class, confidence_score
+
+
+def preprocess_image(image, out=None):
+    """`predict_image` ile aynı ön işlemeyi yapar; (224, 224, 3) float32 tampon döndürür."""
+    if out is None:
+        out = np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    _preprocess_into(image, out)
+    return out
+
+
+def predict_batch(data):
+    """Önceden hazırlanmış (N, 224, 224, 3) partiyi tek model çağrısıyla tahmin eder."""
+    prediction = get_model().predict(data)
+    return [interpret_prediction(row) for row in prediction]
+
+
+def predict_image(image):
+    """Verilen görüntü için model tahmini döndürür."""
+    data = np.ndarray(shape=(1, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    _preprocess_into(image, data[0])
+
+    prediction = get_model().predict(data)
+    return interpret_prediction(prediction[0])
+
+
+def frame_probabilities(frame):
+    """Ham BGR kare için toplamı 1 olan sınıf olasılıkları vektörünü döndürür."""
+    data = _get_frame_buffers()[0]
+    # Yeniden boyutlandırma ve renk dönüşümü model süresinden ayrı ölçülür
+    with metrics.stage("preprocess"):
+        preprocess_frame(frame, out=data[0])
+
+    prediction = get_model().predict(data)[0]
+    return prediction / np.sum(prediction)
+
+
+def predict_frame(frame):
+    """Ham BGR kamera karesi için model tahmini döndürür (PIL dönüşümü olmadan)."""
+    return interpret_prediction(frame_probabilities(frame))
+
+
+def predict_frames(frames):
+    """Birden çok ham BGR kareyi tek bir model çağrısıyla tahmin eder.
+
+    Kareler iş parçacığına ait, yeniden kullanılan bir parti tamponuna
+    hazırlanır; her kare için `predict_frame` ile aynı üçlü döner.
+    """
+    if not frames:
+        return []
+
+    data = getattr(_frame_buffers, "batch", None)
+    if data is None or len(data) < len(frames):
+        data = _frame_buffers.batch = np.empty((len(frames), INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+
+    with metrics.stage("preprocess"):
+        for i, frame in enumerate(frames):
+            preprocess_frame(frame, out=data[i])
+
+    return predict_batch(data[:len(frames)])
+
+
+# Tahmin kayıtlarında saklanan en olası sınıf sayısı
+TOP_K = 5
+
+
+class PredictionRecord:
+    """Tek bir tahminin sıkıştırılmış, yapılandırılmış kaydı.
+
+    `predict_image` üçlüsünün (class_name, category, confidence) yanında
+    tüm olasılık vektörünü float16 olarak, en olası `k` sınıfın indekslerini
+    ve ön işleme / çıkarım sürelerini (görüntü başına ms) taşır. Eşikler
+    sonradan modeli yeniden çalıştırmadan bu vektörlerle ayarlanabilir.
+    """
+
+    __slots__ = ("timestamp", "source", "class_name", "category", "confidence", "probabilities",
+                 "top_indices", "preprocess_ms", "inference_ms", "batch_size")
+
+    def __init__(self, timestamp, source, class_name, category, confidence, probabilities, top_indices,
+                 preprocess_ms=None, inference_ms=None, batch_size=1):
+        self.timestamp = timestamp
+        self.source = source
+        self.class_name = class_name
+        self.category = category
+        self.confidence = confidence
+        self.probabilities = probabilities
+        self.top_indices = top_indices
+        self.preprocess_ms = preprocess_ms
+        self.inference_ms = inference_ms
+        self.batch_size = batch_size
+
+    @property
+    def result(self):
+        """`predict_image` ile aynı üçlü."""
+        return self.class_name, self.category, self.confidence
+
+    @property
+    def top_k(self):
+        """En olası sınıflar: [(class_name, category, probability), ...], büyükten küçüğe."""
+        class_names = get_class_names()
+        return [
+            (class_names[i], get_animal_class(class_names[i]), float(self.probabilities[i]))
+            for i in self.top_indices
+        ]
+
+    def replace(self, **changes):
+        """Verilen alanları değiştirilmiş bir kopya döndürür."""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return PredictionRecord(**values)
+
+    def to_dict(self):
+        values = {name: getattr(self, name) for name in self.__slots__ if name not in ("probabilities", "top_indices")}
+        values["confidence"] = float(self.confidence) if self.confidence is not None else None
+        values["top_k"] = self.top_k
+        return values
+
+    def __repr__(self):
+        return f"PredictionRecord({self.class_name!r}, {self.category!r}, {self.confidence}, source={self.source!r})"
+
+
+def _make_records(prediction, k, source, preprocess_ms, inference_ms):
+    """Model çıktısı partisini PredictionRecord listesine çevirir."""
+    timestamp = time.time()
+    probabilities = prediction / np.sum(prediction, axis=1, keepdims=True)
+    k = min(k, probabilities.shape[1])
+    top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    records = []
+    for row, candidates in zip(probabilities, top):
+        class_name, category, confidence = interpret_prediction(row)
+        records.append(PredictionRecord(
+            timestamp, source, class_name, category, confidence,
+            row.astype(np.float16),
+            candidates[np.argsort(-row[candidates])].astype(np.int16),
+            preprocess_ms, inference_ms, len(prediction)
+        ))
+    return records
+
+
+def predict_records(images, k=TOP_K, batch_size=32, source=None):
+    """`predict_images` gibi, ama her görüntü için bir PredictionRecord döndürür."""
+    records = []
+    batches = _iter_batches(images, batch_size)
+    while True:
+        start = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            return records
+        preprocessed = time.perf_counter()
+        prediction = get_model().predict(batch)
+        done = time.perf_counter()
+        records.extend(_make_records(prediction, k, source, (preprocessed - start) * 1000 / len(batch),
+                                     (done - preprocessed) * 1000 / len(batch)))
+
+
+def predict_frame_record(frame, k=TOP_K, source=None):
+    """Ham BGR kare için PredictionRecord döndürür."""
+    start = time.perf_counter()
+    data = _get_frame_buffers()[0]
+    preprocess_frame(frame, out=data[0])
+    preprocessed = time.perf_counter()
+    prediction = get_model().predict(data)
+    done = time.perf_counter()
+    return _make_records(prediction, k, source, (preprocessed - start) * 1000, (done - preprocessed) * 1000)[0]
+
+
+def warm_up(batch_sizes=(1,)):
+    """Modeli yükler ve sahte girdilerle bir kez çalıştırır.
+
+    Böylece model yükleme ve ilk çağrıdaki graph tracing gecikmesi ilk
+    gerçek kareye yansımaz. Süreç başına bir kez çağırmak yeterlidir.
+    """
+    model = get_model()
+    for batch_size in batch_sizes:
+        model.predict(np.zeros((batch_size, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32))
+
+
+def _warm_up_background():
+    global _warm_up_error
+    try:
+        warm_up()
+    except Exception as e:
+        # Hata wait_for_warm_up() çağıran sayfada gösterilir
+        _warm_up_error = e
+
+
+def warm_up_async():
+    """warm_up'ı arka planda bir kez başlatır; iş parçacığını döndürür.
+
+    Önceki deneme hatayla bittiyse (ör. model dosyası eksikti) yeniden dener.
+    """
+    global _warm_up_thread, _warm_up_error
+    with _warm_up_lock:
+        if _warm_up_thread is None or (_warm_up_error is not None and not _warm_up_thread.is_alive()):
+            _warm_up_error = None
+            _warm_up_thread = threading.Thread(target=_warm_up_background, name="model-warm-up", daemon=True)
+            _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def wait_for_warm_up():
+    """Arka plandaki warm_up'ın bitmesini bekler; hata verdiyse o hatayı yeniden fırlatır."""
+    warm_up_async().join()
+    error = _warm_up_error
+    if error is not None:
+        raise error
+
+
+def _iter_batches(images, batch_size):
+    """Görüntüleri önceden ayrılmış tek bir float32 tampona parti parti yazar."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    data = np.empty((batch_size, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    iterator = iter(images)
+
+    while True:
+        count = 0
+        for image in itertools.islice(iterator, batch_size):
+            _preprocess_into(image, data[count])
+            count += 1
+        if count == 0:
+            return
+
+        yield data[:count]
+
+        if count < batch_size:
+            return
+
+
+def predict_images(images, batch_size=32):
+    """Birden çok görüntüyü toplu olarak tahmin eder.
+
+    `images` PIL görüntüleri veya RGB numpy kareleri olabilir (generator da olur).
+    Her `batch_size` görüntü tek bir önceden ayrılmış float32 tampona yazılır ve
+    model her parti için yalnızca bir kez çağrılır. Sonuç, her görüntü için
+    `predict_image` ile aynı kurallara göre üretilmiş
+    (class_name, animal_class, confidence) üçlülerinin listesidir.
+    """
+    results = []
+    for batch in _iter_batches(images, batch_size):
+        results.extend(predict_batch(batch))
+    return results
+
+
+def compare_backends(sample_images, candidate, reference="keras", batch_size=32):
+    """İki arka ucun örnek görüntüler üzerindeki doğruluk uyumunu raporlar.
+
+    Dönen sözlük; ilk tahmin uyumunu, `predict_image` karar uyumunu (eşikler
+    dahil), olasılıklardaki ortalama/en büyük mutlak farkı ve her iki arka ucun
+    görüntü başına ortalama süresini (ms) içerir.
+    """
+    sample_images = list(sample_images)
+    if not sample_images:
+        raise ValueError("compare_backends needs at least one sample image")
+
+    backends = {name: load_backend(name) for name in (reference, candidate)}
+    probabilities = {name: [] for name in backends}
+    elapsed = dict.fromkeys(backends, 0.0)
+
+    for batch in _iter_batches(sample_images, batch_size):
+        for name, backend in backends.items():
+            start = time.perf_counter()
+            prediction = backend.predict(batch)
+            elapsed[name] += time.perf_counter() - start
+            probabilities[name].append(prediction / np.sum(prediction, axis=1, keepdims=True))
+
+    ref = np.concatenate(probabilities[reference])
+    cand = np.concatenate(probabilities[candidate])
+    decisions_ref = [interpret_prediction(row)[0] for row in ref]
+    decisions_cand = [interpret_prediction(row)[0] for row in cand]
+    count = len(sample_images)
+
+    return {
+        "samples": count,
+        "top1_agreement": float(np.mean(ref.argmax(axis=1) == cand.argmax(axis=1))),
+        "decision_agreement": float(np.mean([a == b for a, b in zip(decisions_ref, decisions_cand)])),
+        "mean_abs_diff": float(np.mean(np.abs(ref - cand))),
+        "max_abs_diff": float(np.max(np.abs(ref - cand))),
+        f"{reference}_ms_per_image": elapsed[reference] * 1000 / count,
+        f"{candidate}_ms_per_image": elapsed[candidate] * 1000 / count,
+    }
+
+
+def _load_sample_images(directory, limit=200):
+    """Bir klasördeki görüntüleri (en fazla `limit` adet) RGB PIL görüntüsü olarak yükler."""
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(directory)
+        for name in files
+        if name.lower().endswith((".jpg", ".jpeg", ".png", ".bmp"))
+    )
+    return [Image.open(path).convert("RGB") for path in paths[:limit]]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Convert keras_model.h5 and check backend accuracy parity.")
+    parser.add_argument("backend", choices=sorted(BACKEND_ARTIFACTS), help="Target inference backend")
+    parser.add_argument("--samples", help="Folder of sample images for int8 calibration and the parity report")
+    args = parser.parse_args()
+
+    samples = _load_sample_images(args.samples) if args.samples else None
+    if args.backend.endswith("-int8") and not samples:
+        parser.error(f"{args.backend} needs --samples for calibration and the parity report")
+    print(f"Wrote {convert_model(args.backend, sample_images=samples)}")
+    if samples:
+        print(json.dumps(compare_backends(samples, args.backend), indent=4))
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Prediction records are optional, like the detection archive
+    pa = None
+
+from log_archive import write_atomic
+
+# Date-partitioned Parquet files of full prediction records
+RECORDS_DIR = "logs/predictions"
+LABELS_FILE = "_labels.json"
+
+RECORDS_AVAILABLE = pa is not None
+
+
+def _schema(num_classes):
+    return pa.schema([
+        ("timestamp", pa.timestamp("ms")),
+        ("source", pa.dictionary(pa.int32(), pa.string())),
+        ("class_name", pa.dictionary(pa.int16(), pa.string())),
+        ("category", pa.dictionary(pa.int8(), pa.string())),
+        ("confidence", pa.float32()),
+        ("top_indices", pa.list_(pa.int16())),
+        ("probabilities", pa.list_(pa.float16(), num_classes)),
+        ("preprocess_ms", pa.float32()),
+        ("inference_ms", pa.float32()),
+        ("batch_size", pa.int16()),
+    ])
+
+
+def records_to_table(records):
+    """Turn PredictionRecords into a columnar table (one fixed-size float16 vector per row)."""
+    probabilities = np.stack([record.probabilities for record in records]).astype(np.float16)
+    schema = _schema(probabilities.shape[1])
+    columns = {
+        # Local wall-clock time, like the detection log
+        "timestamp": pa.array([datetime.fromtimestamp(record.timestamp) for record in records], pa.timestamp("ms")),
+        "source": pa.array([record.source for record in records], pa.string()).dictionary_encode(),
+        "class_name": pa.array([record.class_name for record in records], pa.string()).dictionary_encode(),
+        "category": pa.array([record.category for record in records], pa.string()).dictionary_encode(),
+        "confidence": pa.array([record.confidence for record in records], pa.float32()),
+        "top_indices": pa.array([record.top_indices.tolist() for record in records], pa.list_(pa.int16())),
+        "probabilities": pa.FixedSizeListArray.from_arrays(pa.array(probabilities.ravel()), probabilities.shape[1]),
+        "preprocess_ms": pa.array([record.preprocess_ms for record in records], pa.float32()),
+        "inference_ms": pa.array([record.inference_ms for record in records], pa.float32()),
+        "batch_size": pa.array([record.batch_size for record in records], pa.int16()),
+    }
+    return pa.Table.from_pydict(columns).cast(schema)
+
+
+class PredictionRecordStore:
+    """Buffers PredictionRecords and writes them as date-partitioned Parquet.
+
+    Records are grouped by day into `date=YYYY-MM-DD/part-<id>.parquet`
+    files of up to `flush_every` rows (zstd-compressed, probability
+    vectors as float16). The label order of the probability vectors is
+    saved next to them in `_labels.json`, so the archive stays readable
+    if labels.txt changes later.
+    """
+
+    def __init__(self, directory=RECORDS_DIR, flush_every=5000):
+        if not RECORDS_AVAILABLE:
+            raise RuntimeError("pyarrow is required for prediction records")
+        self.directory = directory
+        self.flush_every = flush_every
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def append(self, records):
+        with self._lock:
+            self._pending.extend(records)
+            if len(self._pending) >= self.flush_every:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        labels_path = os.path.join(self.directory, LABELS_FILE)
+        if not os.path.exists(labels_path):
+            from modular import get_class_names
+
+            labels = get_class_names()
+
+            def write_labels(path):
+                with open(path, "w") as f:
+                    json.dump(labels, f)
+
+            write_atomic(labels_path, write_labels)
+
+        by_day = {}
+        for record in self._pending:
+            by_day.setdefault(datetime.fromtimestamp(record.timestamp).date(), []).append(record)
+        for day, records in by_day.items():
+            directory = os.path.join(self.directory, f"date={day.isoformat()}")
+            os.makedirs(directory, exist_ok=True)
+            table = records_to_table(records)
+            write_atomic(os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"),
+                         lambda path: pq.write_table(table, path, compression="zstd"))
+        self._pending = []
+
+
+def read_labels(directory=RECORDS_DIR):
+    with open(os.path.join(directory, LABELS_FILE), "r") as f:
+        return json.load(f)
+
+
+def read_records(directory=RECORDS_DIR, start_date=None, end_date=None, columns=None):
+    """Read stored records as a pyarrow table, pruning partitions by date."""
+    dataset = ds.dataset(directory, format="parquet", partitioning="hive", ignore_prefixes=["_", "."])
+    expression = None
+    if start_date is not None:
+        expression = ds.field("date") >= start_date.isoformat()
+    if end_date is not None:
+        condition = ds.field("date") <= end_date.isoformat()
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def read_probabilities(directory=RECORDS_DIR, start_date=None, end_date=None):
+    """Return `(metadata DataFrame, probabilities float16 array of shape (N, classes))`."""
+    table = read_records(directory, start_date, end_date,
+                         columns=["timestamp", "source", "class_name", "confidence", "probabilities"])
+    vectors = table.column("probabilities").combine_chunks()
+    width = vectors.type.list_size
+    probabilities = np.asarray(vectors.flatten()).reshape(-1, width) if len(vectors) else np.empty((0, width), np.float16)
+    metadata = table.drop_columns(["probabilities"]).to_pandas()
+    return metadata, probabilities
+
+
+def threshold_sweep(probabilities, labels, thresholds=(0.80, 0.85, 0.90, 0.95, 0.98), ignore=("Human", "Environment")):
+    """How many stored predictions would count as detections at each confidence threshold.
+
+    Recomputed from the stored vectors, so new thresholds can be tried over
+    the whole archive without running the model again.
+    """
+    probabilities = probabilities.astype(np.float32)
+    top = probabilities.argmax(axis=1)
+    confidence = probabilities[np.arange(len(top)), top]
+    ignored = np.isin(np.asarray(labels)[top], ignore)
+    rows = []
+    for threshold in thresholds:
+        accepted = (confidence >= threshold) & ~ignored
+        rows.append({
+            "threshold": threshold,
+            "detections": int(accepted.sum()),
+            "share": float(accepted.mean()) if len(accepted) else 0.0,
+            "species": int(len(np.unique(top[accepted]))),
+        })
+    return pd.DataFrame(rows)
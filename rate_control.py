@@ -0,0 +1,103 @@
+import os
+import time
+
+from metrics import Metrics
+from video_source import MotionGate
+
+# Defaults for the live camera; a solar box can lower the budget and raise the idle ceiling
+TARGET_LATENCY = float(os.environ.get("DETECTION_TARGET_LATENCY", 0.5))
+CPU_BUDGET = float(os.environ.get("DETECTION_CPU_BUDGET", 0.5))
+
+
+class AdaptiveRate:
+    """Chooses how long the camera pipeline waits between inferences.
+
+    After every inference `update()` is given the frame, how long the model
+    took and its result. Two measurements set the active interval: the
+    inference latency against `target_latency`, and the process CPU usage
+    (a share of all cores, from `time.process_time()`) against
+    `cpu_budget`. Going over either backs the interval off in proportion;
+    with headroom it shrinks again by 10% per inference, down to
+    `min_interval`.
+
+    A cheap thumbnail motion check and any candidate detection mark the
+    scene as active and snap back to the active interval. After
+    `idle_seconds` without either, the interval grows by `backoff` per
+    inference up to `max_interval`, so an empty scene costs a fraction of
+    the power and the first frame of motion is at most `max_interval` late.
+    """
+
+    def __init__(self, target_latency=TARGET_LATENCY, cpu_budget=CPU_BUDGET, min_interval=0.05, max_interval=2.0,
+                 idle_seconds=15.0, backoff=1.5, motion=None, metrics=None):
+        self.target_latency = target_latency
+        self.cpu_budget = cpu_budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_seconds = idle_seconds
+        self.backoff = backoff
+        # Never lets a frame through on a timer: only real change counts as motion here
+        self.motion = motion or MotionGate(max_skip_seconds=float("inf"))
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self._cores = os.cpu_count() or 1
+
+        self.active_interval = min_interval
+        self.current = min_interval
+        self.latency = None
+        self.cpu = None
+        self.last_activity = time.time()
+        self._sample = (time.time(), time.process_time())
+
+    def interval(self):
+        return self.current
+
+    def _measure_cpu(self, now):
+        # Averaged over at least a second so one slow call doesn't swing it
+        wall_start, cpu_start = self._sample
+        if now - wall_start >= 1.0:
+            used = (time.process_time() - cpu_start) / (now - wall_start) / self._cores
+            self.cpu = used if self.cpu is None else 0.5 * self.cpu + 0.5 * used
+            self._sample = (now, time.process_time())
+
+    def update(self, frame, seconds, result=None, now=None):
+        """Record one inference and return the interval to wait before the next one."""
+        now = time.time() if now is None else now
+        self.latency = seconds if self.latency is None else 0.7 * self.latency + 0.3 * seconds
+        self._measure_cpu(now)
+
+        # Latency only counts while the model is busy over a quarter of the time: past
+        # that, waiting longer between inferences can't make a slow host any faster
+        slow = self.latency > self.target_latency
+        busy = self.latency / self.active_interval
+        pressure = self.cpu / self.cpu_budget if self.cpu is not None else 0.0
+        if slow and busy > 0.25:
+            pressure = max(pressure, self.latency / self.target_latency)
+        if pressure > 1.0:
+            self.active_interval *= min(pressure, 2.0)
+            self.metrics.increment("rate_backoffs")
+        elif pressure < 0.8 and not (slow and busy > 0.2):
+            self.active_interval *= 0.9
+        self.active_interval = min(max(self.active_interval, self.min_interval), self.max_interval)
+
+        candidate = isinstance(result, tuple) and result[0] is not None
+        if candidate or (frame is not None and self.motion.should_infer(frame, now)):
+            self.last_activity = now
+            self.current = self.active_interval
+        elif now - self.last_activity >= self.idle_seconds:
+            self.current = min(max(self.current, self.active_interval) * self.backoff, self.max_interval)
+        else:
+            self.current = self.active_interval
+        self.metrics.observe("inference_interval", self.current)
+        return self.current
+
+    @property
+    def idle(self):
+        return self.current > self.active_interval
+
+    def stats(self):
+        return {
+            "interval": self.current,
+            "active_interval": self.active_interval,
+            "idle": self.idle,
+            "latency_ms": self.latency * 1000 if self.latency is not None else None,
+            "cpu": self.cpu,
+        }
@@ -0,0 +1,181 @@
+import argparse
+import contextlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from detection_store import JsonlDetectionStore, get_store
+from log_archive import compact, has_archive, write_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs are not serialized between processes
+    fcntl = None
+
+# Raw detections older than this are folded into daily per-species summaries
+RAW_RETENTION_DAYS = int(os.environ.get("DETECTION_RAW_RETENTION_DAYS", 90))
+
+# Next to the store: `<store>.summaries.jsonl` and the time of the last run
+SUMMARY_SUFFIX = ".summaries.jsonl"
+STATE_SUFFIX = ".retention.json"
+LOCK_SUFFIX = ".retention.lock"
+
+
+def summary_store(store):
+    """Checksummed, append-only file of the store's daily summaries (never rotated)."""
+    return JsonlDetectionStore(store.path + SUMMARY_SUFFIX, max_bytes=0, rotate_every="none")
+
+
+def read_summaries(store):
+    return summary_store(store).read_all()
+
+
+def summarize(entries, source):
+    """Fold raw detections into one summary per day, species and category."""
+    summaries = {}
+    for entry in entries:
+        day = entry["timestamp"][:10]
+        confidence = float(entry["confidence_score"])
+        key = (day, entry["class_name"], entry.get("category"))
+        summary = summaries.get(key)
+        if summary is None:
+            summaries[key] = {
+                "date": day,
+                "class_name": entry["class_name"],
+                "category": entry.get("category"),
+                "count": 1,
+                "confidence_sum": confidence,
+                "confidence_min": confidence,
+                "confidence_max": confidence,
+                "source": source,
+            }
+        else:
+            summary["count"] += 1
+            summary["confidence_sum"] += confidence
+            summary["confidence_min"] = min(summary["confidence_min"], confidence)
+            summary["confidence_max"] = max(summary["confidence_max"], confidence)
+    return sorted(summaries.values(), key=lambda s: (s["date"], s["class_name"]))
+
+
+@contextlib.contextmanager
+def _retention_lock(store):
+    # Exclusive across threads and processes, so two runs never append the same summaries
+    fd = os.open(store.path + LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def downsample(store=None, max_age_days=RAW_RETENTION_DAYS, now=None):
+    """Replace raw detections older than `max_age_days` with daily summaries.
+
+    For the JSON Lines store whole rotated segments are folded, so records
+    in the active file wait until it is rotated. Summaries are written
+    before the raw records are dropped and are tagged with where they came
+    from, so an interrupted run can simply be repeated. Returns
+    `(folded records, cutoff date)`.
+    """
+    store = store or get_store()
+    with _retention_lock(store):
+        folded, _, cutoff = _downsample(store, max_age_days, now)
+    return folded, cutoff
+
+
+def _downsample(store, max_age_days, now, index=None):
+    # With an index, each batch's records leave its table before they leave the store
+    cutoff = ((now or datetime.now()) - timedelta(days=max_age_days)).strftime("%Y-%m-%d")
+    summaries = summary_store(store)
+    done = {summary.get("source") for summary in summaries.read_all()}
+
+    folded = pruned = 0
+    for source, entries, drop in store.expired_batches(cutoff):
+        if source not in done:
+            summaries.append_many(summarize(entries, source))
+        if index is not None:
+            pruned += index.prune(source, entries)
+        drop()
+        folded += len(entries)
+    return folded, pruned, cutoff
+
+
+def _state_path(store):
+    return store.path + STATE_SUFFIX
+
+
+def last_run(store=None):
+    try:
+        with open(_state_path(store or get_store()), "r") as f:
+            return datetime.fromisoformat(json.load(f)["last_run"])
+    except (FileNotFoundError, json.JSONDecodeError, KeyError, ValueError):
+        return None
+
+
+def run_retention(store=None, max_age_days=RAW_RETENTION_DAYS, now=None):
+    """Downsample expired detections without losing them from the dashboard or the archive.
+
+    The index and (if there is one) the archive catch up first, so their
+    aggregates already count every record that is about to be dropped;
+    afterwards the index forgets exactly the folded rows but keeps its rollup.
+    """
+    store = store or get_store()
+    with _retention_lock(store):
+        return _run_retention(store, max_age_days, now)
+
+
+def _run_retention(store, max_age_days, now):
+    from detection_index import get_index
+
+    now = now or datetime.now()
+    index = get_index(store)
+    index.refresh()
+    if has_archive():
+        compact(store)
+
+    folded, pruned, cutoff = _downsample(store, max_age_days, now, index)
+
+    state = {"last_run": now.isoformat(timespec="seconds"), "cutoff": cutoff, "folded": folded}
+
+    def write_state(path):
+        with open(path, "w") as f:
+            json.dump(state, f)
+
+    write_atomic(_state_path(store), write_state)
+    return {"folded": folded, "pruned": pruned, "cutoff": cutoff}
+
+
+def run_retention_if_due(store=None, every_hours=24, max_age_days=RAW_RETENTION_DAYS, now=None):
+    """Run retention if the last run was more than `every_hours` ago; returns the result or None."""
+    store = store or get_store()
+    previous = last_run(store)
+    if previous is not None and datetime.now() - previous < timedelta(hours=every_hours):
+        return None
+    with _retention_lock(store):
+        # Checked again under the lock: another render may have just finished a run
+        previous = last_run(store)
+        if previous is not None and datetime.now() - previous < timedelta(hours=every_hours):
+            return None
+        return _run_retention(store, max_age_days, now)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rotate, check and downsample the detection log.")
+    parser.add_argument("--max-age-days", type=int, default=RAW_RETENTION_DAYS,
+                        help="Keep raw detections for this many days (default: %(default)s)")
+    parser.add_argument("--rotate", action="store_true", help="Rotate the active JSON Lines file first")
+    args = parser.parse_args()
+
+    store = get_store()
+    if isinstance(store, JsonlDetectionStore):
+        print(f"Tail check: {store.validate_tail()}")
+        if args.rotate:
+            store.rotate()
+    result = run_retention(store, args.max_age_days)
+    print(f"Folded {result['folded']} detections before {result['cutoff']} into daily summaries "
+          f"({result['pruned']} rows pruned from the index)")
+
+
+if __name__ == "__main__":
+    main()
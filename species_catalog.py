@@ -0,0 +1,120 @@
+import json
+import os
+import re
+import threading
+
+# Species info file path
+SPECIES_INFO_FILE = "database/endangered.json"
+
+# Model labels whose name differs from the species database key
+SPECIES_ALIASES = {
+    "Pseudoryx nghetinhensis saola": "Saola",
+}
+
+# Returned when a species isn't in the database
+DEFAULT_SPECIES_DETAILS = {
+    "scientific_name": "Not available",
+    "status": "Unknown"
+}
+
+
+def normalize_name(name):
+    """Lowercase a species name and collapse spaces, hyphens and underscores."""
+    return re.sub(r"[\s_\-]+", " ", name).strip().lower()
+
+
+class SpeciesCatalog:
+    """Species database loaded once per process and reloaded when the file changes.
+
+    Lookups go through a normalized-name index and an alias table, so they
+    are O(1). Names that miss both fall back once to the old substring match
+    and the answer is memoized, so repeated lookups stay O(1) too.
+    """
+
+    def __init__(self, path=SPECIES_INFO_FILE, aliases=SPECIES_ALIASES):
+        self.path = path
+        self.aliases = {normalize_name(k): v for k, v in aliases.items()}
+        self.error = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._species = {}
+        self._index = {}
+        self._resolved = {}
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime and self._mtime is not None:
+            return
+
+        with self._lock:
+            if mtime == self._mtime and self._mtime is not None:
+                return
+            species = {}
+            if mtime is None:
+                self.error = f"Species info file not found: {self.path}"
+            else:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        species = json.load(f)
+                    self.error = None
+                except Exception as e:
+                    self.error = f"Error loading species info: {e}"
+
+            index = {}
+            for name in species:
+                index.setdefault(normalize_name(name), name)
+            for alias, name in self.aliases.items():
+                if name in species:
+                    index.setdefault(alias, name)
+
+            self._species = species
+            self._index = index
+            self._resolved = {}
+            self._mtime = mtime
+
+    def _resolve(self, name):
+        key = normalize_name(name)
+        if key in self._index:
+            return self._index[key]
+        if key not in self._resolved:
+            # Same partial match as before, done once per unknown name
+            match = None
+            for species in self._species:
+                species_key = normalize_name(species)
+                if key in species_key or species_key in key:
+                    match = species
+                    break
+            self._resolved[key] = match
+        return self._resolved[key]
+
+    def lookup(self, name):
+        """Return the database entry for `name`, or the default details."""
+        self._refresh()
+        species = self._resolve(name)
+        if species is None:
+            return DEFAULT_SPECIES_DETAILS
+        return self._species[species]
+
+    def __contains__(self, name):
+        self._refresh()
+        return self._resolve(name) is not None
+
+    def __len__(self):
+        self._refresh()
+        return len(self._species)
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Return the process-wide species catalog."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = SpeciesCatalog()
+        return _catalog
@@ -0,0 +1,141 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from modular import frame_probabilities, interpret_prediction
+
+NO_DETECTION = (None, None, None)
+
+
+class TemporalAggregator:
+    """Smooths per-frame class probabilities into stable detections.
+
+    In "ema" mode an exponential moving average (`alpha` is the weight of
+    the newest frame) is kept over the probability vectors. In "vote" mode
+    the last `window` frames vote with their top class, and the winner's
+    confidence is its mean probability over the frames that voted for it. Either way a
+    detection is only reported once the same class has led for
+    `min_frames` updates in a row (in "vote" mode: won at least `min_frames`
+    of the window's votes) and its smoothed confidence passes the
+    usual `predict_image` rules (no Human/Environment, at least 90%).
+
+    The current stable detection is a track: it keeps an id, the class,
+    when it started and how many frames supported it. A running track
+    survives brief dips as long as its class still leads and stays above
+    `keep_confidence`, so a single odd frame doesn't make the label flicker.
+    A new class, or the evidence fading, ends the track.
+    """
+
+    def __init__(self, mode="ema", alpha=0.4, window=5, min_frames=3, keep_confidence=0.6):
+        if mode not in ("ema", "vote"):
+            raise ValueError(f"Unknown smoothing mode: {mode}")
+        self.mode = mode
+        self.alpha = alpha
+        self.window = window
+        self.min_frames = min_frames
+        self.keep_confidence = keep_confidence
+
+        self._average = None
+        self._history = deque(maxlen=window)
+        self._leader = None
+        self._streak = 0
+        self.track = None
+        self._track_ids = 0
+
+    def reset(self):
+        self._average = None
+        self._history.clear()
+        self._leader = None
+        self._streak = 0
+        self.track = None
+
+    def _smoothed(self, probabilities):
+        """Returns the smoothed probability vector and whether its leading class is stable."""
+        if self.mode == "ema":
+            if self._average is None:
+                self._average = probabilities.astype(np.float64)
+            else:
+                self._average *= 1 - self.alpha
+                self._average += self.alpha * probabilities
+            leader = int(np.argmax(self._average))
+            self._streak = self._streak + 1 if leader == self._leader else 1
+            self._leader = leader
+            return self._average, self._streak >= self.min_frames
+
+        self._history.append(probabilities)
+        leaders = [int(np.argmax(p)) for p in self._history]
+        winner = max(set(leaders), key=leaders.count)
+        smoothed = np.mean([p for p, leader in zip(self._history, leaders) if leader == winner], axis=0)
+        return smoothed, leaders.count(winner) >= self.min_frames
+
+    def update(self, probabilities, now=None):
+        """Add one frame's probabilities; returns the stable detection triple or no detection."""
+        now = time.time() if now is None else now
+        smoothed, stable = self._smoothed(np.asarray(probabilities))
+
+        result = interpret_prediction(smoothed) if stable else NO_DETECTION
+        class_name, category, confidence_score = result
+        if class_name is None:
+            leader = int(np.argmax(smoothed))
+            if self.track is None or leader != self.track["index"] or smoothed[leader] < self.keep_confidence:
+                self.track = None
+                return NO_DETECTION
+            # Hold the running track through a short dip
+            class_name, category, confidence_score = self.track["class_name"], self.track["category"], smoothed[leader]
+            result = class_name, category, confidence_score
+
+        if self.track is None or self.track["class_name"] != class_name:
+            self._track_ids += 1
+            self.track = {"id": self._track_ids, "index": int(np.argmax(smoothed)), "class_name": class_name,
+                          "category": category, "started": now, "frames": 0}
+        self.track["frames"] += 1
+        self.track["confidence"] = float(confidence_score)
+        self.track["updated"] = now
+        return result
+
+
+class SmoothedPredictor:
+    """Frame classifier that reports smoothed, stable detections.
+
+    Wraps `probabilities(frame)` (by default `modular.frame_probabilities`)
+    with a TemporalAggregator. While a track is at least `skip_confidence`
+    confident, the model is skipped and the track is repeated, re-checking
+    the scene every `recheck_seconds`. Like GatedPredictor it is a drop-in
+    for `predict_frame` and counts how many model calls were saved.
+    """
+
+    def __init__(self, aggregator=None, probabilities=frame_probabilities, skip_confidence=0.97,
+                 recheck_seconds=1.0):
+        self.aggregator = aggregator or TemporalAggregator()
+        self.probabilities = probabilities
+        self.skip_confidence = skip_confidence
+        self.recheck_seconds = recheck_seconds
+        self.frames_seen = 0
+        self.frames_inferred = 0
+        self._last_inferred = 0.0
+
+    def __call__(self, frame):
+        self.frames_seen += 1
+        now = time.time()
+        track = self.aggregator.track
+        if track is not None and track["confidence"] >= self.skip_confidence \
+                and now - self._last_inferred < self.recheck_seconds:
+            return track["class_name"], track["category"], track["confidence"]
+
+        self.frames_inferred += 1
+        self._last_inferred = now
+        return self.aggregator.update(self.probabilities(frame), now)
+
+    @property
+    def frames_skipped(self):
+        return self.frames_seen - self.frames_inferred
+
+    def stats(self):
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_inferred": self.frames_inferred,
+            "frames_skipped": self.frames_skipped,
+            "budget_saved": self.frames_skipped / self.frames_seen if self.frames_seen else 0.0,
+            "track": self.aggregator.track,
+        }
@@ -0,0 +1,74 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import modular  # noqa: E402
+
+# Camera resolutions, plus frames smaller than the model input that have to be upscaled
+FRAME_SIZES = [(1280, 720), (640, 480), (320, 240), (200, 150), (160, 120)]
+
+
+def scene(width, height, seed):
+    """A synthetic outdoor-like BGR frame: sky/ground gradient, textured ground, a few blobs and sensor noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    horizon = height * rng.uniform(0.3, 0.6)
+    sky = np.stack([230 - 80 * y / height, 190 - 60 * y / height, 140 + 0 * y], axis=-1)
+    grass = np.stack([40 + 0 * y, 110 + 30 * np.sin(x / 9.0) * np.cos(y / 7.0), 70 + 20 * np.sin(y / 5.0)], axis=-1)
+    frame = np.where((y < horizon)[..., None], sky, grass)
+    for _ in range(4):
+        center = (int(rng.uniform(0, width)), int(rng.uniform(horizon, height)))
+        axes = (int(rng.uniform(0.05, 0.2) * width), int(rng.uniform(0.05, 0.15) * height))
+        cv2.ellipse(frame, center, axes, rng.uniform(0, 180), 0, 360, rng.uniform(20, 200, 3).tolist(), -1)
+    frame = cv2.GaussianBlur(frame, (3, 3), 0) + rng.normal(0, 4, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def reference_input(frame):
+    """The PIL path `predict_image` uses, fed the same frame."""
+    out = np.empty((modular.INPUT_SIZE[1], modular.INPUT_SIZE[0], 3), dtype=np.float32)
+    modular._preprocess_into(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)), out)
+    return out
+
+
+def frame_input(frame):
+    return modular.preprocess_frame(frame, out=np.empty_like(reference_input(frame)))
+
+
+@pytest.mark.parametrize("size", FRAME_SIZES)
+def test_preprocess_frame_matches_pil_path(size):
+    frames = [scene(*size, seed) for seed in range(5)]
+    parity = modular.preprocess_parity(frames)
+    # Values are in [-1, 1]: 0.015 is about 2 of 255 grey levels on average, 0.2 about 25 at worst
+    assert parity["mean_abs_diff"] < 0.015
+    assert parity["max_abs_diff"] < 0.2
+
+
+def test_preprocess_frame_keeps_top1_of_a_fixed_classifier():
+    # A fixed random linear classifier over 35 classes, so the check runs without the model file
+    rng = np.random.default_rng(0)
+    weights = rng.normal(size=(modular.INPUT_SIZE[1] * modular.INPUT_SIZE[0] * 3, 35)).astype(np.float32)
+    for size in FRAME_SIZES:
+        for seed in range(5):
+            frame = scene(*size, seed)
+            expected = np.argmax(reference_input(frame).ravel() @ weights)
+            assert np.argmax(frame_input(frame).ravel() @ weights) == expected
+
+
+def test_preprocess_frame_keeps_model_top1():
+    pytest.importorskip("tensorflow")
+    model_path = os.path.join(ROOT, modular.MODEL_PATH)
+    if not os.path.exists(model_path):
+        pytest.skip("keras_model.h5 not available")
+    model = modular.load_backend("keras", model_path)
+    frames = [scene(*size, seed) for size in FRAME_SIZES for seed in range(3)]
+    reference = model.predict(np.stack([reference_input(frame) for frame in frames]))
+    candidate = model.predict(np.stack([frame_input(frame) for frame in frames]))
+    assert (reference.argmax(axis=1) == candidate.argmax(axis=1)).all()
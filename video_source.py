@@ -0,0 +1,194 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class SampledVideoSource:
+    """Video file or stream (RTSP/HTTP URL, device index) read at a fixed sample rate.
+
+    Frames between samples are skipped with `grab()`, which doesn't decode
+    them: for files a fixed number of frames, for live streams every frame
+    until the next sample is due. With `realtime=True`, file playback is paced to the
+    file's own frame rate, as a live source would be. `read()` has the same
+    `(ret, frame)` shape as cv2.VideoCapture, so it can feed CameraPipeline.
+    """
+
+    def __init__(self, source, sample_fps=2.0, realtime=True):
+        self.source = source
+        self.capture = cv2.VideoCapture(source)
+        self.sample_fps = sample_fps
+        self.realtime = realtime
+        self.is_file = isinstance(source, str) and "://" not in source
+        self.finished = False
+
+        native_fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.native_fps = native_fps if native_fps and native_fps > 0 else 30.0
+        self.frame_step = max(1, round(self.native_fps / sample_fps)) if sample_fps else 1
+        self.frames_decoded = 0
+        self.frames_grabbed = 0
+        self._last_sample = None
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        if self.finished:
+            return False, None
+
+        if self.is_file:
+            # Skip the frames between samples without decoding them
+            for _ in range(self.frame_step - 1):
+                if not self.capture.grab():
+                    self.finished = True
+                    return False, None
+                self.frames_grabbed += 1
+            ret, frame = self.capture.read()
+            if not ret:
+                self.finished = True
+                return False, None
+            if self.realtime:
+                self._pace(self.frame_step / self.native_fps)
+        else:
+            # Live streams: drain frames with grab() until the next sample is due, then decode only that one
+            ret = self.capture.grab()
+            while ret and self.sample_fps and self._last_sample is not None \
+                    and time.time() - self._last_sample < 1.0 / self.sample_fps:
+                ret = self.capture.grab()
+                self.frames_grabbed += 1
+            self._last_sample = time.time()
+            if ret:
+                ret, frame = self.capture.retrieve()
+            if not ret:
+                return False, None
+
+        self.frames_decoded += 1
+        return True, frame
+
+    def _pace(self, interval):
+        now = time.time()
+        if self._last_sample is not None:
+            wait = interval - (now - self._last_sample)
+            if wait > 0:
+                time.sleep(wait)
+        self._last_sample = time.time()
+
+    def release(self):
+        self.capture.release()
+
+
+class MotionGate:
+    """Decides whether a frame changed enough to be worth running the model on.
+
+    Frames are downscaled to a small grayscale thumbnail. In "diff" mode a
+    frame counts as motion when more than `min_changed` of its pixels differ
+    by over `pixel_threshold` from the last frame that was let through. In
+    "mog2" mode OpenCV's background subtractor decides instead. A frame is
+    always let through after `max_skip_seconds` so a still animal that
+    walked in slowly is eventually classified.
+    """
+
+    def __init__(self, mode="diff", pixel_threshold=25, min_changed=0.01, max_skip_seconds=10.0,
+                 thumbnail_size=(64, 48)):
+        if mode not in ("diff", "mog2"):
+            raise ValueError(f"Unknown motion gate mode: {mode}")
+        self.mode = mode
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_skip_seconds = max_skip_seconds
+        self.thumbnail_size = thumbnail_size
+        self._reference = None
+        self._last_pass = 0.0
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if mode == "mog2" else None
+
+    def _thumbnail(self, frame):
+        small = cv2.resize(frame, self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def changed_fraction(self, frame):
+        """Fraction of thumbnail pixels that changed (updates the background model in mog2 mode)."""
+        thumbnail = self._thumbnail(frame)
+        if self.mode == "mog2":
+            mask = self._subtractor.apply(thumbnail)
+            return float(np.count_nonzero(mask)) / mask.size
+        if self._reference is None:
+            return 1.0
+        diff = cv2.absdiff(thumbnail, self._reference)
+        return float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+
+    def should_infer(self, frame, now=None):
+        now = time.time() if now is None else now
+        changed = self.changed_fraction(frame)
+        if changed >= self.min_changed or now - self._last_pass >= self.max_skip_seconds:
+            self._reference = self._thumbnail(frame) if self.mode == "diff" else None
+            self._last_pass = now
+            return True
+        return False
+
+
+class GatedPredictor:
+    """Wraps a frame classifier so static scenes skip the model.
+
+    Skipped frames return `(None, None, None)`, the same as "nothing
+    detected". Counters report how much of the inference budget was saved.
+    """
+
+    def __init__(self, predict, gate=None):
+        self.predict = predict
+        self.gate = gate or MotionGate()
+        self.frames_seen = 0
+        self.frames_inferred = 0
+
+    def __call__(self, frame):
+        self.frames_seen += 1
+        if not self.gate.should_infer(frame):
+            return None, None, None
+        self.frames_inferred += 1
+        return self.predict(frame)
+
+    @property
+    def frames_skipped(self):
+        return self.frames_seen - self.frames_inferred
+
+    def stats(self):
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_inferred": self.frames_inferred,
+            "frames_skipped": self.frames_skipped,
+            "budget_saved": self.frames_skipped / self.frames_seen if self.frames_seen else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from modular import predict_frame
+
+    parser = argparse.ArgumentParser(description="Classify a video file or stream with motion gating.")
+    parser.add_argument("source", help="Video file path or stream URL")
+    parser.add_argument("--sample-fps", type=float, default=2.0, help="Frames per second to sample (default: 2)")
+    parser.add_argument("--gate", choices=["diff", "mog2", "off"], default="diff", help="Motion gate (default: diff)")
+    args = parser.parse_args()
+
+    source = SampledVideoSource(args.source, args.sample_fps, realtime=False)
+    predictor = GatedPredictor(predict_frame, MotionGate(args.gate)) if args.gate != "off" else None
+    frames = 0
+    while True:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames += 1
+        class_name, category, confidence_score = (predictor or predict_frame)(frame)
+        if class_name:
+            position = frames * source.frame_step / source.native_fps
+            print(f"{position:8.1f}s  {class_name} ({category}) {confidence_score * 100:.2f}%")
+    source.release()
+
+    if predictor:
+        stats = predictor.stats()
+        print(f"Sampled {stats['frames_seen']} frames, inferred {stats['frames_inferred']}, "
+              f"skipped {stats['frames_skipped']} ({stats['budget_saved'] * 100:.1f}% of inference saved)")
+    else:
+        print(f"Sampled and inferred {frames} frames")